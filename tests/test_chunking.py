@@ -0,0 +1,68 @@
+import re
+
+from langchain_core.documents import Document
+
+from tools.chunking import chunk_documents, count_tokens, make_chunk_id
+
+
+def sentences(topic, n, start=0):
+    return [f"Rule {i} of the {topic} policy applies after {i + 3} days of service." for i in range(start, start + n)]
+
+
+def page(lines, number, source="handbook.pdf"):
+    return Document(page_content="\n".join(lines), metadata={"source": source, "page": number})
+
+
+def handbook():
+    return [
+        page(["Paid Time Off"] + sentences("leave", 12), 0),
+        page(sentences("leave", 12, start=12) + ["Remote Work"] + sentences("telework", 10), 1),
+    ]
+
+
+def test_chunks_fit_the_budget_including_title_and_reserved_header():
+    for reserved in (0, 20):
+        chunks = chunk_documents(handbook(), chunk_tokens=80, overlap_tokens=20, reserved_tokens=reserved)
+        assert chunks
+        assert all(count_tokens(chunk.page_content) + reserved <= 80 for chunk in chunks)
+
+
+def test_section_title_carries_across_page_breaks():
+    chunks = chunk_documents(handbook(), chunk_tokens=80, overlap_tokens=0)
+    carried = [chunk for chunk in chunks if chunk.metadata["page"] == 1 and "Rule 20 of the leave" in chunk.page_content]
+    assert carried
+    for chunk in carried:
+        assert chunk.metadata["section_title"] == "Paid Time Off"
+        assert chunk.page_content.startswith("Paid Time Off\n")
+    assert chunks[-1].metadata["section_title"] == "Remote Work"
+    assert not any("leave" in chunk.page_content and "telework" in chunk.page_content for chunk in chunks)
+
+
+def test_consecutive_chunks_overlap_by_trailing_sentences():
+    chunks = chunk_documents([page(["Paid Time Off"] + sentences("leave", 30), 0)], chunk_tokens=80, overlap_tokens=20)
+    assert len(chunks) > 2
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.page_content.rsplit(". ", 1)[-1]
+        assert last_sentence in current.page_content
+
+
+def test_long_sentence_is_split_without_losing_words():
+    words = [f"word{i}" for i in range(400)]
+    chunks = chunk_documents([page([" ".join(words) + "."], 0)], chunk_tokens=60, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk.page_content) <= 60 for chunk in chunks)
+    assert re.findall(r"word\d+", " ".join(chunk.page_content for chunk in chunks)) == words
+
+
+def test_chunk_ids_are_stable_content_hashes():
+    first = chunk_documents(handbook(), chunk_tokens=80, overlap_tokens=0)
+    second = chunk_documents(handbook(), chunk_tokens=80, overlap_tokens=0)
+    assert [chunk.metadata["chunk_id"] for chunk in first] == [chunk.metadata["chunk_id"] for chunk in second]
+    assert all(chunk.metadata["chunk_id"] == make_chunk_id(chunk.page_content) for chunk in first)
+
+    revised = handbook()
+    revised[1].page_content = revised[1].page_content.replace("Rule 5 of the telework", "Rule 5 of the hybrid")
+    revised_ids = {chunk.metadata["chunk_id"] for chunk in chunk_documents(revised, chunk_tokens=80, overlap_tokens=0)}
+    kept = [chunk for chunk in first if chunk.metadata["chunk_id"] in revised_ids]
+    assert len(kept) == len(first) - 1  # only the chunk holding the edited sentence gets a new ID
+    assert all("Rule 5 of the telework" not in chunk.page_content for chunk in kept)
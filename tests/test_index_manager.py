@@ -0,0 +1,91 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from tools.index_manager import IndexManager
+
+MB = 1024 * 1024
+
+
+def fake_vectorstore(mb=1):
+    """Just enough of a FAISS vectorstore for PartitionIndex and the size estimate: `mb` MiB of vectors."""
+    return SimpleNamespace(
+        index=SimpleNamespace(ntotal=mb * 256, d=1024),
+        index_to_docstore_id={},
+        docstore=SimpleNamespace(search=lambda doc_id: None),
+    )
+
+
+class StubLoader:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, name):
+        with self._lock:
+            self.calls.append(name)
+        time.sleep(self.delay)
+        return fake_vectorstore(), 0.5
+
+
+def test_least_recently_used_index_is_evicted_first():
+    manager = IndexManager(loader=StubLoader(), memory_budget_mb=2.5)
+    manager.get("a")
+    manager.get("b")
+    manager.get("a")  # b is now the least recently used
+    manager.get("c")
+
+    assert manager.loaded() == ["a", "c"]
+    assert manager.resident_bytes() == 2 * MB
+    assert manager.stats()["b"]["evictions"] == 1
+
+
+def test_just_loaded_index_stays_even_over_budget():
+    manager = IndexManager(loader=StubLoader(), memory_budget_mb=0.5)
+    manager.get("a")
+    assert manager.loaded() == ["a"]
+
+    manager.get("b")
+    assert manager.loaded() == ["b"]
+    assert manager.stats()["a"]["evictions"] == 1
+
+
+def test_concurrent_first_queries_share_one_load():
+    loader = StubLoader(delay=0.2)
+    manager = IndexManager(loader=loader, memory_budget_mb=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == ["a"]
+    assert len(results) == 8 and all(loaded is results[0] for loaded in results)
+    stats = manager.stats()["a"]
+    assert (stats["loads"], stats["hits"]) == (1, 7)
+
+
+def test_stats_track_hits_loads_and_explicit_evictions():
+    loader = StubLoader()
+    manager = IndexManager(loader=loader, memory_budget_mb=10)
+    loaded = manager.get("a")
+    manager.get("a")
+    manager.get("a")
+
+    assert loaded.cutoff == 0.5 and loaded.resident_bytes == MB
+    stats = manager.stats()["a"]
+    assert (stats["loads"], stats["hits"], stats["evictions"]) == (1, 2, 0)
+    assert stats["resident_bytes"] == MB and stats["loaded"]
+    assert stats["last_load_s"] >= 0 and stats["total_load_s"] >= stats["last_load_s"]
+
+    assert manager.evict("a") is True
+    assert manager.evict("a") is False
+    assert manager.stats()["a"] | {"last_used": None} == stats | {
+        "evictions": 1, "resident_bytes": 0, "loaded": False, "last_used": None
+    }
+
+    manager.get("a")  # reloads after an eviction (e.g. a rebuild)
+    assert loader.calls == ["a", "a"]
+    assert manager.stats()["a"]["loads"] == 2
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from langchain.schema import Document
+
+import tools.vectorstore_builder as builder
+from tools.config import load_secrets
+from tools.embedding_backends import HashingEmbedder
+from tools.embeddings import load_local_vectorstore
+from tools.s3_utils import LocalStore, get_store, set_store
+
+DOCS_BUCKET = "hr-docs"
+INDEX_BUCKET = "hr-index"
+SECTIONS = ["Paid Time Off", "Remote Work", "Timecards"]
+
+
+def policy_text(revised=False) -> str:
+    """Three handbook-style sections; the revision rewrites one sentence of the second."""
+    lines = []
+    for s, title in enumerate(SECTIONS):
+        lines.append(title)
+        for i in range(40):
+            n = s * 100 + i
+            if revised and n == 120:
+                lines.append("Remote work requests now go to the Director of Operations for approval.")
+                continue
+            lines.append(f"Rule {n} of the {title.lower()} policy applies after {n + 3} days with form {n * 7}.")
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("S3_DOCS_BUCKET", DOCS_BUCKET)
+    monkeypatch.setenv("S3_INDEX_BUCKET", INDEX_BUCKET)
+    load_secrets.cache_clear()
+    previous = get_store()
+    store = LocalStore(tmp_path / "s3")
+    set_store(store)
+    # Uploads are plain text saved as .pdf; read them back as one page each
+    monkeypatch.setattr(
+        builder, "load_document",
+        lambda path: [Document(page_content=open(path, encoding="utf-8").read(), metadata={"page": 0})],
+    )
+    yield store
+    set_store(previous)
+    load_secrets.cache_clear()
+
+
+def upload(store, tmp_path, key, text):
+    path = tmp_path / key
+    path.write_text(text, encoding="utf-8")
+    store.upload_file(path, DOCS_BUCKET, key)
+
+
+def test_revised_document_replaces_its_old_chunks(storage, tmp_path):
+    embeddings = HashingEmbedder()
+
+    upload(storage, tmp_path, "policies_v1.pdf", policy_text())
+    files, first_chunks = builder.rebuild_vectorstore_from_s3(embeddings=embeddings, evaluate=False)
+    assert files == 1
+    assert load_local_vectorstore("faiss_index", embeddings).index.ntotal == first_chunks
+
+    upload(storage, tmp_path, "policies_v2.pdf", policy_text(revised=True))
+    files, embedded = builder.rebuild_vectorstore_from_s3(embeddings=embeddings, evaluate=False)
+    assert files == 1
+    assert 0 < embedded < first_chunks  # only the rewritten chunks are embedded again
+
+    # The revision replaces chunks one for one, so the index does not grow
+    vectorstore = load_local_vectorstore("faiss_index", embeddings)
+    assert vectorstore.index.ntotal == first_chunks
+
+    manifest = json.loads((tmp_path / "faiss_index" / "manifest.json").read_text())
+    assert len(manifest["processed_hashes"]) == 2
+    assert len(manifest["superseded"]) == embedded
+    for entry in manifest["superseded"].values():
+        assert (entry["document"], entry["by_document"]) == ("policies_v1.pdf", "policies_v2.pdf")
+        assert vectorstore.docstore.search(entry["superseded_by"]).metadata["document"] == "policies_v2.pdf"
+
+    # The merged index and its manifest are published where the app loads them from
+    uploaded = {obj["Key"] for obj in storage.list_objects(INDEX_BUCKET)}
+    assert {"index.faiss", "index.pkl", "manifest.json"} <= uploaded
@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import collections
 import re
-from pathlib import Path
 
 def show_analytics_dashboard():
     st.title("📊 HR Chatbot Query Analytics")
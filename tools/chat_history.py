@@ -0,0 +1,77 @@
+from tools.chat_pipeline import SENTENCE_BREAK
+
+# --- Bounded Chat History ---
+MAX_VERBATIM_TURNS = 6       # user/assistant pairs kept word for word
+VISIBLE_MESSAGES = 6         # rendered by default; the rest of the window is one click away
+SUMMARY_MAX_CHARS = 1500     # rolling summary of folded turns
+QUESTION_CHARS = 140
+ANSWER_CHARS = 220
+
+
+def init_history(state):
+    state.setdefault("chat_history", [])
+    state.setdefault("history_summary", "")
+    state.setdefault("folded_messages", 0)
+
+
+def reset_history(state):
+    state["chat_history"] = []
+    state["history_summary"] = ""
+    state["folded_messages"] = 0
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def summarize_messages(messages: list) -> list:
+    """One compact line per turn: the question and the first sentence of the answer."""
+    lines, question = [], None
+    for message in messages:
+        if message["role"] == "user":
+            if question:
+                lines.append(f"Q: {question}")
+            question = _clip(message["content"], QUESTION_CHARS)
+        else:
+            first_sentence = SENTENCE_BREAK.split(message["content"].strip(), 1)[0]
+            answer = _clip(first_sentence, ANSWER_CHARS)
+            lines.append(f"Q: {question} → A: {answer}" if question else f"A: {answer}")
+            question = None
+    if question:
+        lines.append(f"Q: {question}")
+    return lines
+
+
+def fold_history(state, max_turns=MAX_VERBATIM_TURNS):
+    """Move messages beyond the last `max_turns` turns into the rolling summary."""
+    history = state["chat_history"]
+    overflow = len(history) - max_turns * 2
+    if overflow <= 0:
+        return
+    if history[overflow]["role"] == "assistant":  # never split a question from its answer
+        overflow += 1
+
+    lines = [line for line in state["history_summary"].splitlines() if line]
+    lines += summarize_messages(history[:overflow])
+    while lines and len("\n".join(lines)) > SUMMARY_MAX_CHARS:
+        lines.pop(0)  # oldest turns drop out first
+
+    state["history_summary"] = "\n".join(lines)
+    state["folded_messages"] += overflow
+    state["chat_history"] = history[overflow:]
+
+
+def append_message(state, role, content):
+    state["chat_history"].append({"role": role, "content": content})
+    fold_history(state)
+
+
+def conversation_context(state) -> str:
+    """Rolling summary plus one line per verbatim turn, compact enough for every answer call."""
+    history = state["chat_history"]
+    # The current question is the last user message; it is sent separately
+    if history and history[-1]["role"] == "user":
+        history = history[:-1]
+    lines = [line for line in state["history_summary"].splitlines() if line] + summarize_messages(history)
+    return "\n".join(lines)
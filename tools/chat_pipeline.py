@@ -0,0 +1,152 @@
+import re
+from tools.prompts import DRAFT_SYSTEM_TEMPLATE, FALLBACK_SYSTEM_PROMPT, RERANK_SYSTEM_PROMPT, REVISE_SYSTEM_PROMPT
+from tools.retrieval_eval import APP_TOP_K, DEFAULT_RELEVANCE_CUTOFF, to_similarity
+
+# --- Chat Pipeline (retrieve → rerank → answer → revise), shared by app.py and the load test ---
+CHAT_MODEL = "gpt-3.5-turbo"
+NO_MATCH_ANSWER = "I couldn’t find a strong match in the handbook. Please try rephrasing or contact HR."
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+# --- Search Scope ("… only" filters hard; new hires default to preferring the orientation guide) ---
+SEARCH_SCOPES = {
+    "All documents": None,
+    "Prefer orientation guide": None,
+    "Orientation guide only": "orientation_guide",
+    "Employee handbook only": "employee_handbook",
+    "Uploaded documents only": "uploads",
+}
+PREFERRED_SCOPES = {"Prefer orientation guide": "orientation_guide"}
+
+def default_scope(tenure):
+    return "Prefer orientation guide" if tenure and tenure.startswith("New Hire") else "All documents"
+
+# --- Rerank Logic ---
+
+def rerank_with_gpt(query, chunks, client):
+    if not chunks:
+        return None
+
+    context_snippets = "\n\n".join([f"Chunk {i+1}:\n{chunk.page_content[:500]}" for i, chunk in enumerate(chunks)])
+
+    messages = [
+        {"role": "system", "content": RERANK_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"User question: {query}\n\nChunks:\n{context_snippets}\n\nWhich chunk best answers the question? Reply with the full content of the best chunk, or say 'none are clearly relevant.'"
+        }
+    ]
+
+    try:
+        response = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages
+        )
+        content = response.choices[0].message.content.strip()
+
+        if "none are clearly relevant" in content.lower():
+            return summarize_fallback(query, chunks, client)
+        return content
+
+    except Exception:
+        return None
+    
+# --- Summarize Fallback ---
+
+def summarize_fallback(query, chunks, client):
+    fallback_context = "\n\n".join([chunk.page_content[:500] for chunk in chunks[:3]])  # top 3 chunks
+
+    messages = [
+        {"role": "system", "content": FALLBACK_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"User question: {query}\n\nPartial content:\n{fallback_context}\n\nPlease provide the most helpful answer you can from this content."
+        }
+    ]
+
+    try:
+        response = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages
+        )
+        return response.choices[0].message.content.strip()
+
+    except Exception:
+        return "I'm not confident I can answer that directly. Please check the handbook or contact HR for guidance."
+    
+# --- Answer Refinement ---
+def revise_answer_with_gpt(question, draft_answer, client):
+    messages = [
+        {"role": "system", "content": REVISE_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"User question: {question}\n\nDraft answer: {draft_answer}\n\nPlease revise this response to make it clearer, more complete, and helpful, while avoiding made-up policy claims."
+        }
+    ]
+    try:
+        response = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages
+        )
+        return response.choices[0].message.content.strip().replace("Revised answer:", "").strip()
+    except Exception:
+        return draft_answer
+
+# --- Meta Query Detector ---
+# Match only simple greeting or assistant-checking phrases (compiled once per process)
+META_QUERY = re.compile(
+    r"^\s*(?:hi|hello|who are you\??|what can you do\??|how do you work\??|can i ask you\??"
+    r"|help me\??|how can you help\??|what is this\??)\s*$"
+)
+
+def detect_meta_query(query):
+    return bool(META_QUERY.match(query.lower().strip()))
+
+# --- Retrieval ---
+def retrieve_chunks(search_index, question, scope=None, prefer=None, cutoff=DEFAULT_RELEVANCE_CUTOFF, k=APP_TOP_K):
+    """
+    Top-k chunks above the cutoff. `scope` restricts the search to one partition.
+    `prefer` is a partition to rank first without excluding the rest: its hits lead, the
+    remainder is filled from all documents, and the best match overall is always kept.
+    """
+    def relevant(results):
+        # FAISS returns L2 distance (lower is better); keep hits above the calibrated cosine cutoff
+        return [doc for doc, score in results if to_similarity(search_index.vectorstore, score) >= cutoff]
+
+    if scope or not prefer:
+        return relevant(search_index.search(question, k=k, source=scope))
+
+    overall = relevant(search_index.search(question, k=k))
+    scoped = relevant(search_index.search(question, k=k, source=prefer))
+    scoped_ids = {doc.metadata.get("chunk_id", doc.page_content) for doc in scoped}
+    others = [doc for doc in overall if doc.metadata.get("chunk_id", doc.page_content) not in scoped_ids]
+    if others and others[0] is overall[0]:  # the best match lies outside the scope
+        scoped = scoped[:k - 1]
+    return (scoped + others)[:k]
+
+# --- Answer ---
+def draft_answer_with_gpt(question, best_chunk, profile, client, conversation=None):
+    messages = [
+        {"role": "system", "content": DRAFT_SYSTEM_TEMPLATE.format(role=profile["role"], tenure=profile["tenure"])},
+        {"role": "user", "content": f"User question: {question}\n\nContext:\n{best_chunk}"}
+    ]
+    if conversation:
+        # Compact summary of earlier turns so follow-up questions resolve without the full transcript
+        messages.insert(1, {"role": "system", "content": f"Conversation so far:\n{conversation}"})
+
+    response = client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages
+    )
+    return response.choices[0].message.content.strip()
+
+def answer_question(
+    question, profile, search_index, client, scope=None, prefer=None, cutoff=DEFAULT_RELEVANCE_CUTOFF, conversation=None
+):
+    """Run one chat turn. Returns (answer, matched); matched is False for the no-match reply."""
+    docs = retrieve_chunks(search_index, question, scope, prefer, cutoff)
+    best_chunk = rerank_with_gpt(question, docs, client)
+    if not best_chunk:
+        return NO_MATCH_ANSWER, False
+
+    draft_answer = draft_answer_with_gpt(question, best_chunk, profile, client, conversation)
+    return revise_answer_with_gpt(question, draft_answer, client), True
@@ -0,0 +1,221 @@
+import hashlib
+import pickle
+import re
+import time
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from langchain_core.documents import Document
+
+# --- Chunking Defaults (shared by every builder) ---
+CHUNK_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 40
+TOKEN_ENCODING = "cl100k_base"  # tokenizer used by OpenAI embedding models
+
+PUNKT_PICKLE = Path(__file__).resolve().parent.parent / "nltk_data" / "tokenizers" / "punkt" / "PY3" / "english.pickle"
+
+# Numbered handbook headings ("315 Paid Time Off (PTO)") or short title lines ("Travel Guidelines")
+SECTION_PATTERN = re.compile(r"^(?:\d{3,4}\s+[A-Z].{3,}|[A-Z][A-Za-z&()'’ -]{2,60})$")
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+DIGITS = re.compile(r"\d+")
+FALLBACK_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"“(])")
+
+
+# --- Sentence Splitting (shipped punkt model) ---
+@lru_cache(maxsize=1)
+def get_sentence_splitter():
+    """Load the bundled punkt model once per process; fall back to a regex splitter."""
+    try:
+        with open(PUNKT_PICKLE, "rb") as f:
+            tokenizer = pickle.load(f)  # bundled with the repo, not user-supplied
+        return tokenizer.tokenize
+    except Exception as e:
+        print(f"⚠️ Punkt model unavailable, using regex sentence splitter: {e}")
+        return lambda text: [s for s in FALLBACK_SENTENCE_END.split(text) if s.strip()]
+
+
+# --- Token Counting ---
+@lru_cache(maxsize=1)
+def get_token_counter():
+    """Return a batch token counter: tiktoken when available, a word/punctuation estimate otherwise."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        return lambda texts: [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable, estimating token counts: {e}")
+        return lambda texts: [len(WORD_PATTERN.findall(text)) for text in texts]
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter()([text])[0]
+
+
+def make_chunk_id(text: str) -> str:
+    """Stable content hash: the same chunk text always gets the same ID."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# --- Page Cleanup ---
+def find_boilerplate_lines(pages: list, min_share: float = 0.5) -> set:
+    """Lines repeated on most pages (running headers/footers), compared with digits masked."""
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for page in pages:
+        counts.update({DIGITS.sub("#", line.strip()) for line in page.page_content.splitlines() if line.strip()})
+    return {line for line, n in counts.items() if n >= len(pages) * min_share}
+
+
+def _sections(pages: list):
+    """Yield (title, text, page_offsets, page_docs) for each section; a section may span pages."""
+    boilerplate = find_boilerplate_lines(pages)
+    title, lines, offsets, owners, size = "", [], [], [], 0
+
+    def flush():
+        text = "\n".join(lines)
+        return (title, text, offsets, owners) if text.strip() else None
+
+    for page in pages:
+        page_started = False
+        for raw in page.page_content.splitlines():
+            line = raw.strip()
+            if not line or DIGITS.sub("#", line) in boilerplate:
+                continue
+            if SECTION_PATTERN.match(line):
+                section = flush()
+                if section:
+                    yield section
+                title = " ".join(re.sub(r"[^\w\s:()&-]", "", line).split())
+                lines, offsets, owners, size = [], [], [], 0
+                page_started = False
+                continue
+            if not page_started:
+                offsets.append(size)
+                owners.append(page)
+                page_started = True
+            lines.append(line)
+            size += len(line) + 1
+
+    section = flush()
+    if section:
+        yield section
+
+
+def _split_long_sentence(sentence: str, n_tokens: int, chunk_tokens: int) -> list:
+    words = sentence.split()
+    per_piece = max(1, int(len(words) * chunk_tokens / max(n_tokens, 1)))
+    return [" ".join(words[i:i + per_piece]) for i in range(0, len(words), per_piece)]
+
+
+# --- Chunker ---
+def chunk_documents(
+    documents: list,
+    chunk_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    reserved_tokens: int = 0,
+) -> list:
+    """
+    Split loaded pages into token-sized chunks on sentence boundaries.
+
+    Pages that share a `source` are treated as one document, so section titles carry
+    across page breaks. Each chunk starts with its section title and keeps the metadata
+    of the page it starts on, plus `page`, `section_title` and a content-hash
+    `chunk_id`. Exact duplicate chunks are dropped. The title line counts against
+    `chunk_tokens`, as does `reserved_tokens` for a header the caller adds afterwards.
+    """
+    split_sentences = get_sentence_splitter()
+    count = get_token_counter()
+
+    # Group consecutive pages by source file
+    groups = []
+    for doc in documents:
+        if groups and groups[-1][0].metadata.get("source") == doc.metadata.get("source"):
+            groups[-1].append(doc)
+        else:
+            groups.append([doc])
+
+    chunks, seen = [], set()
+
+    def emit(title, sentences, owner):
+        text = " ".join(sentences).strip()
+        if not text:
+            return
+        # Heading lines are cut from the section body; keep the name searchable in every chunk
+        text = f"{title}\n{text}" if title else text
+        chunk_id = make_chunk_id(text)
+        if chunk_id in seen:
+            return
+        seen.add(chunk_id)
+        metadata = dict(owner.metadata)
+        metadata.update({
+            "page": owner.metadata.get("page", 0),
+            "section_title": title,
+            "chunk_id": chunk_id,
+        })
+        chunks.append(Document(page_content=text, metadata=metadata))
+
+    for pages in groups:
+        for title, text, offsets, owners in _sections(pages):
+            sentences, starts, pos = [], [], 0
+            for sentence in split_sentences(text):
+                pos = text.find(sentence, pos)
+                starts.append(max(pos, 0))
+                sentences.append(sentence)
+                pos += len(sentence)
+            sizes = count(sentences)
+            budget = max(1, chunk_tokens - reserved_tokens - (count([f"{title}\n"])[0] if title else 0))
+
+            window, total = [], 0  # (text, tokens, page) per sentence
+            for sentence, start, n in zip(sentences, starts, sizes):
+                owner = owners[bisect_right(offsets, start) - 1]
+                pieces = [sentence] if n <= budget else _split_long_sentence(sentence, n, budget)
+                piece_sizes = [n] if len(pieces) == 1 else count(pieces)
+
+                for piece, piece_n in zip(pieces, piece_sizes):
+                    if window and total + piece_n > budget:
+                        emit(title, [s for s, _, _ in window], window[0][2])
+                        # Carry trailing sentences forward as overlap
+                        carried, total = [], 0
+                        for item in reversed(window):
+                            if total + item[1] > min(overlap_tokens, budget - piece_n):
+                                break
+                            carried.insert(0, item)
+                            total += item[1]
+                        window = carried
+                    window.append((piece, piece_n, owner))
+                    total += piece_n
+
+            if window:
+                emit(title, [s for s, _, _ in window], window[0][2])
+
+    return chunks
+
+
+# --- Benchmark ---
+def benchmark(paths=None, repeat: int = 5):
+    """Time chunk_documents over the corpus and report throughput in MB/s."""
+    from tools.loaders import load_document
+
+    paths = paths or sorted(str(p) for p in Path("docs").glob("*") if p.suffix in (".pdf", ".docx"))
+    documents = [doc for path in paths for doc in load_document(path)]
+    size_mb = sum(len(doc.page_content.encode("utf-8")) for doc in documents) / 1e6
+
+    chunks = chunk_documents(documents)  # warm-up: loads punkt and the tokenizer
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunk_documents(documents)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"📄 {len(documents)} pages, {size_mb:.2f} MB → {len(chunks)} chunks")
+    print(f"⏱ best {best * 1000:.1f} ms, mean {sum(timings) / len(timings) * 1000:.1f} ms over {repeat} runs")
+    print(f"🚀 Throughput: {size_mb / best:.2f} MB/s")
+    return {"pages": len(documents), "chunks": len(chunks), "seconds": best, "mb_per_s": size_mb / best}
+
+
+if __name__ == "__main__":
+    import sys
+    benchmark(sys.argv[1:] or None)
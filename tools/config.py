@@ -0,0 +1,28 @@
+import os
+import sys
+from functools import lru_cache
+
+SECRETS_PATH = ".streamlit/secrets.toml"
+
+
+@lru_cache(maxsize=1)
+def load_secrets() -> dict:
+    """Read secrets once per process: st.secrets inside the app, the secrets file in scripts."""
+    if "streamlit" in sys.modules:
+        try:
+            return dict(sys.modules["streamlit"].secrets)
+        except Exception:
+            pass
+    try:
+        import toml
+        return toml.load(SECRETS_PATH)
+    except Exception:
+        return {}
+
+
+def get_secret(key: str, default=None):
+    """Look up a setting in the secrets file, then the environment."""
+    value = load_secrets().get(key)
+    if value is None:
+        value = os.getenv(key, default)
+    return value
@@ -0,0 +1,76 @@
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+
+# --- MinHash / LSH Settings ---
+NUM_PERM = 128
+LSH_BANDS = 16                 # 16 bands × 8 rows: pairs above ~0.7 Jaccard almost always collide
+SHINGLE_WORDS = 5
+NEAR_DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity of 5-word shingles
+_PRIME = (1 << 31) - 1         # Mersenne prime; a·x + b stays well inside uint64
+_WORDS = re.compile(r"\w+")
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, vectorized with numpy."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORDS.findall(text.lower())
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text) % _PRIME
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def estimate_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+def deduplicate(chunks: list, threshold=NEAR_DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+    """
+    Keep the first chunk of every near-duplicate cluster, so pass chunks newest first.
+
+    Returns (kept_chunks, superseded) where superseded maps each dropped chunk's
+    chunk_id to the chunk_id of the version that replaced it.
+    """
+    hasher = MinHasher()
+    rows = NUM_PERM // bands
+    buckets = defaultdict(list)
+    kept, signatures, superseded = [], [], {}
+
+    for chunk in chunks:
+        signature = hasher.signature(chunk.page_content)
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+
+        candidates = {index for key in keys for index in buckets.get(key, ())}
+        match = next(
+            (index for index in sorted(candidates) if estimate_similarity(signature, signatures[index]) >= threshold),
+            None,
+        )
+        if match is not None:
+            superseded[chunk.metadata["chunk_id"]] = kept[match].metadata["chunk_id"]
+            continue
+
+        for key in keys:
+            buckets[key].append(len(kept))
+        kept.append(chunk)
+        signatures.append(signature)
+
+    return kept, superseded
+
+
+def newest_first(chunks: list) -> list:
+    """Order chunks by `uploaded_at`, newest first; chunks without a date (bundled docs) go last."""
+    def uploaded(chunk):
+        value = chunk.metadata.get("uploaded_at")
+        return datetime.fromisoformat(str(value)).timestamp() if value else float("-inf")
+    return sorted(chunks, key=uploaded, reverse=True)
@@ -0,0 +1,228 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import re
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+INDEX_META_FILE = "embedding.json"
+DEFAULT_BACKEND = "openai"
+DEFAULT_LOCAL_MODEL = "models/all-MiniLM-L6-v2"
+QUERY_CACHE_SIZE = 1024
+
+# Indexes built before backends were recorded all used OpenAI ada-002
+LEGACY_INDEX_META = {"backend": "openai", "model": "text-embedding-ada-002", "dimension": 1536}
+
+
+class EmbeddingMismatchError(ValueError):
+    """The index on disk was built by a different embedding backend or dimension."""
+
+
+# --- Load API Key ---
+def get_openai_api_key():
+    load_dotenv()
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("❌ OPENAI_API_KEY is not set. Please check your .env file or Streamlit secrets.")
+    return key
+
+
+# --- Backend Interface ---
+class EmbeddingBackend(Embeddings):
+    """LangChain-compatible embedder that also reports which model and dimension it produces."""
+
+    name = "base"
+    model = ""
+    dimension = 0
+
+    def __init__(self):
+        # One cache per backend instance, so an instance (and its model) can be freed
+        self._cached_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_query_tuple)
+
+    @abstractmethod
+    def embed_documents(self, texts):
+        """Embed a batch of texts."""
+
+    def _embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def _embed_query_tuple(self, text):
+        return tuple(self._embed_query(text))
+
+    def embed_query(self, text):
+        # Repeated questions ("How many vacation days do I get?") skip the model entirely
+        return list(self._cached_query(text))
+
+    def fresh_copy(self):
+        """Shallow copy that shares the model but starts with its own empty query cache."""
+        clone = copy.copy(self)
+        EmbeddingBackend.__init__(clone)
+        return clone
+
+    def describe(self) -> dict:
+        return {"backend": self.name, "model": self.model, "dimension": self.dimension}
+
+
+class OpenAIBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, api_key=None, model="text-embedding-ada-002", dimension=1536):
+        super().__init__()
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        self.model = model
+        self.dimension = dimension
+        self._client = OpenAIEmbeddings(openai_api_key=api_key or get_openai_api_key(), model=model)
+
+    def embed_documents(self, texts):
+        return self._client.embed_documents(list(texts))
+
+    def _embed_query(self, text):
+        return self._client.embed_query(text)
+
+
+class LocalOnnxBackend(EmbeddingBackend):
+    """
+    CPU sentence embedder served from a local directory, no network required.
+
+    The directory holds a Hugging Face `tokenizer.json` and an ONNX export of the model
+    (`model_quantized.onnx` is preferred over `model.onnx`). Output vectors are mean-pooled
+    and L2-normalized. Documents are embedded in batches spread over a thread pool.
+    """
+
+    name = "local"
+
+    def __init__(self, model_dir=DEFAULT_LOCAL_MODEL, batch_size=32, workers=None, max_length=256):
+        super().__init__()
+        try:
+            import numpy as np
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("❌ The local embedding backend needs `onnxruntime` and `tokenizers` installed.") from e
+
+        model_dir = Path(model_dir)
+        model_file = next((model_dir / f for f in ("model_quantized.onnx", "model.onnx") if (model_dir / f).exists()), None)
+        if model_file is None or not (model_dir / "tokenizer.json").exists():
+            raise FileNotFoundError(f"❌ No ONNX model and tokenizer.json found in '{model_dir}/'.")
+
+        self._np = np
+        self.model = model_dir.name
+        self.batch_size = batch_size
+        self.workers = workers or min(4, os.cpu_count() or 1)
+
+        self._tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed")
+
+        self.dimension = len(self._encode(["dimension probe"])[0])
+
+    def _encode(self, texts):
+        np = self._np
+        encodings = self._tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self._session.run(None, feeds)[0]
+        weights = mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        vectors = []
+        for batch_vectors in self._pool.map(self._encode, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def _embed_query(self, text):
+        return self._encode([text])[0]
+
+
+class HashingEmbedder(EmbeddingBackend):
+    """Deterministic bag-of-words hashing embedder for tests and offline index builds."""
+
+    name = "hashing"
+    model = "blake2b-unigram-bigram"
+    _words = re.compile(r"\w+")
+
+    def __init__(self, dimension=384):
+        super().__init__()
+        self.dimension = dimension
+
+    def _embed_query(self, text):
+        words = self._words.findall(text.lower())
+        vector = [0.0] * self.dimension
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed_query(text) for text in texts]
+
+
+# --- Backend Selection ---
+@lru_cache(maxsize=None)
+def get_embedding_backend(name=None, api_key=None, model_dir=None) -> EmbeddingBackend:
+    """
+    Return the process-wide embedding backend. `name` defaults to the EMBEDDING_BACKEND
+    environment variable (openai | local | hashing).
+    """
+    name = name or os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    if name == "openai":
+        return OpenAIBackend(api_key=api_key)
+    if name == "local":
+        return LocalOnnxBackend(model_dir or os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL))
+    if name == "hashing":
+        return HashingEmbedder()
+    raise ValueError(f"❌ Unknown embedding backend: {name}")
+
+
+# --- Index Metadata ---
+def write_index_metadata(index_dir, backend: EmbeddingBackend):
+    with open(Path(index_dir) / INDEX_META_FILE, "w") as f:
+        json.dump(backend.describe(), f)
+
+
+def read_index_metadata(index_dir) -> dict:
+    meta_file = Path(index_dir) / INDEX_META_FILE
+    if not meta_file.exists():
+        print(f"⚠️ No {INDEX_META_FILE} in '{index_dir}/', assuming a legacy OpenAI index.")
+        return dict(LEGACY_INDEX_META)
+    with open(meta_file) as f:
+        return json.load(f)
+
+
+def verify_index_metadata(index_dir, backend: EmbeddingBackend, index_dimension=None):
+    """Raise EmbeddingMismatchError if the index was not built by `backend`."""
+    meta = read_index_metadata(index_dir)
+    if meta["backend"] != backend.name or meta.get("model") != backend.model:
+        raise EmbeddingMismatchError(
+            f"❌ Index in '{index_dir}/' was built with {meta['backend']}:{meta.get('model')}, "
+            f"but the active backend is {backend.name}:{backend.model}. Rebuild the index or switch EMBEDDING_BACKEND."
+        )
+    for dimension in (meta["dimension"], index_dimension):
+        if dimension is not None and dimension != backend.dimension:
+            raise EmbeddingMismatchError(
+                f"❌ Index in '{index_dir}/' has dimension {dimension}, but {backend.name} produces {backend.dimension}."
+            )
+    return meta
@@ -1,24 +1,42 @@
-import os
 from pathlib import Path
-from dotenv import load_dotenv
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from tools.embedding_backends import (
+    INDEX_META_FILE,
+    get_embedding_backend,
+    get_openai_api_key,
+    verify_index_metadata,
+    write_index_metadata,
+)
+from tools.config import get_secret
+from tools.index_manager import DEFAULT_INDEX, resolve_index_location
 from tools.loaders import enrich_pdf_chunks, chunk_docx_with_metadata
+from tools.retrieval_eval import CALIBRATION_FILE, evaluate_after_rebuild, mark_unevaluated, raise_on_regression
+from tools.s3_utils import StorageError, download_file_from_s3, download_files, upload_file_to_s3
 
-# --- Load API Key ---
-def get_openai_api_key():
-    load_dotenv()
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise ValueError("❌ OPENAI_API_KEY is not set. Please check your .env file or Streamlit secrets.")
-    return key
+MANIFEST_FILE = "manifest.json"  # ingestion record written by rebuild_vectorstore_from_s3
+OPTIONAL_INDEX_FILES = [INDEX_META_FILE, CALIBRATION_FILE, MANIFEST_FILE]
+
+# --- Save Vectorstore (index + backend record + retrieval calibration) ---
+def save_vectorstore(vectorstore, index_path, embeddings, evaluate=True):
+    """Save the index and its backend record; returns the golden-set evaluation, if it ran."""
+    vectorstore.save_local(index_path)
+    write_index_metadata(index_path, embeddings)
+    if evaluate:
+        return evaluate_after_rebuild(vectorstore, index_path)
+    mark_unevaluated(index_path, "evaluation disabled")
+    return None
 
 # --- Load Vectorstore ---
-def load_faiss_vectorstore(index_name, openai_api_key, index_dir="faiss_index"):
-    import boto3, toml, botocore
-    from pathlib import Path
+def load_local_vectorstore(index_dir, embeddings):
+    """Load a saved index, refusing indexes built by another backend."""
+    vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    verify_index_metadata(index_dir, embeddings, vectorstore.index.d)
+    return vectorstore
 
-    path = Path(index_dir)
+
+def load_faiss_vectorstore(index_name, openai_api_key, index_dir=None, embeddings=None):
+    local_dir, prefix = resolve_index_location(index_name)
+    path = Path(index_dir or local_dir)
     faiss_file = path / "index.faiss"
     pkl_file = path / "index.pkl"
 
@@ -26,32 +44,30 @@ def load_faiss_vectorstore(index_name, openai_api_key, index_dir="faiss_index"):
 
     # Try loading from S3 first
     try:
-        print("☁️ Attempting to load FAISS index from S3...")
-        secrets = toml.load(".streamlit/secrets.toml")
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=secrets["AWS_ACCESS_KEY_ID"],
-            aws_secret_access_key=secrets["AWS_SECRET_ACCESS_KEY"],
-            region_name=secrets["AWS_REGION"]
-        )
-        bucket = secrets["S3_INDEX_BUCKET"]
-        s3.download_file(bucket, "index.faiss", str(faiss_file))
-        s3.download_file(bucket, "index.pkl", str(pkl_file))
+        print(f"☁️ Attempting to load FAISS index '{index_name}' from S3...")
+        bucket = get_secret("S3_INDEX_BUCKET")
+        if not bucket:
+            raise StorageError("S3_INDEX_BUCKET is not set")
+        download_files(bucket, {f"{prefix}index.faiss": faiss_file, f"{prefix}index.pkl": pkl_file})
         print("✅ Successfully loaded FAISS index from S3")
-
-    except botocore.exceptions.BotoCoreError as e:
+        for file_name in OPTIONAL_INDEX_FILES:
+            try:
+                download_file_from_s3(f"{prefix}{file_name}", bucket, str(path / file_name))
+            except StorageError as e:
+                # A copy left from an older index would be read as this one's
+                (path / file_name).unlink(missing_ok=True)
+                print(f"⚠️ No {file_name} on S3 ({e}); removed any local copy")
+
+    except StorageError as e:
         print("⚠️ Failed to load from S3, falling back to local. Error:", e)
         if not faiss_file.exists() or not pkl_file.exists():
-            raise FileNotFoundError("❌ No local index found either. Cannot load vectorstore.")
+            raise FileNotFoundError(f"❌ No local index found either for '{index_name}'. Cannot load vectorstore.")
 
-    # Load from local files
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-    return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    embeddings = embeddings or get_embedding_backend(api_key=openai_api_key)
+    return load_local_vectorstore(path, embeddings)
 
 # --- Build and Save Combined Vectorstore ---
-def build_combined_vectorstore(pdf_path: str, docx_path: str, index_path: str, api_key: str):
-    import toml
-
+def build_combined_vectorstore(pdf_path: str, docx_path: str, index_path: str, api_key: str, embeddings=None, index_name=DEFAULT_INDEX):
     print("📥 Enriching PDF handbook...")
     pdf_chunks = enrich_pdf_chunks(pdf_path)
 
@@ -61,32 +77,22 @@ def build_combined_vectorstore(pdf_path: str, docx_path: str, index_path: str, a
     all_chunks = pdf_chunks + docx_chunks
     print(f"✅ Total chunks: {len(all_chunks)}")
 
-    embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-    vectorstore = FAISS.from_documents(all_chunks, embeddings)
-    vectorstore.save_local(index_path)
+    embeddings = embeddings or get_embedding_backend(api_key=api_key)
+    vectorstore = FAISS.from_documents(all_chunks, embeddings, ids=[chunk.metadata["chunk_id"] for chunk in all_chunks])
+    raise_on_regression(save_vectorstore(vectorstore, index_path, embeddings))
     print(f"✅ Vectorstore saved to: {index_path}/")
 
     # ✅ Upload to S3 after saving locally
-    secrets = toml.load(".streamlit/secrets.toml")
-    upload_index_to_s3(index_path, secrets["S3_INDEX_BUCKET"])
+    upload_index_to_s3(index_path, get_secret("S3_INDEX_BUCKET"), index_name)
 
     return vectorstore
 
-def upload_index_to_s3(index_path: str, bucket: str, secrets_path=".streamlit/secrets.toml"):
-    import boto3, toml
-    from pathlib import Path
-
-    secrets = toml.load(secrets_path)
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=secrets["AWS_ACCESS_KEY_ID"],
-        aws_secret_access_key=secrets["AWS_SECRET_ACCESS_KEY"],
-        region_name=secrets["AWS_REGION"]
-    )
-
-    index_files = ["index.faiss", "index.pkl"]
+def upload_index_to_s3(index_path: str, bucket: str, index_name: str = DEFAULT_INDEX):
+    _, prefix = resolve_index_location(index_name)
+    index_files = ["index.faiss", "index.pkl"] + OPTIONAL_INDEX_FILES
     for file_name in index_files:
         local_path = Path(index_path) / file_name
-        s3.upload_file(str(local_path), bucket, file_name)
-        print(f"☁️ Uploaded {file_name} to S3 bucket {bucket}")
-
+        if not local_path.exists():
+            continue
+        upload_file_to_s3(str(local_path), f"{prefix}{file_name}", bucket)
+        print(f"☁️ Uploaded {prefix}{file_name} to S3 bucket {bucket}")
@@ -0,0 +1,178 @@
+"""
+Serve several vectorstores (per subsidiary or contract program) from one process.
+
+Indexes load on first query and stay in an LRU bounded by a memory budget; the
+least recently used ones are evicted when a new load pushes residency over it.
+
+    manager = IndexManager(memory_budget_mb=1024)
+    loaded = manager.get("program_x")       # LoadedIndex(vectorstore, search_index, cutoff, ...)
+    manager.stats()                          # per-index hits, loads, load time, resident bytes
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.config import get_secret
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+
+# --- Index Locations ---
+DEFAULT_INDEX = "index"
+INDEX_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+
+def resolve_index_location(index_name: str = DEFAULT_INDEX):
+    """
+    (local_dir, s3_prefix) for an index. The default index keeps its original layout
+    (faiss_index/ locally, bucket root on S3); every other index lives under indexes/<name>/.
+    """
+    if index_name == DEFAULT_INDEX:
+        return Path("faiss_index"), ""
+    if not INDEX_NAME_PATTERN.match(index_name):
+        raise ValueError(f"Invalid index name: {index_name!r}")
+    return Path("indexes") / index_name, f"indexes/{index_name}/"
+
+
+def configured_indexes() -> dict:
+    """Knowledge bases offered in the app: label → index name, from the [INDEXES] secrets table."""
+    indexes = get_secret("INDEXES")
+    return dict(indexes) if indexes else {"Innovim HR": DEFAULT_INDEX}
+
+
+# --- Loaded Indexes ---
+@dataclass
+class LoadedIndex:
+    name: str
+    vectorstore: object
+    search_index: object      # tools.partitions.PartitionIndex over the vectorstore
+    cutoff: float             # calibrated relevance cutoff for this index
+    resident_bytes: int
+
+
+@dataclass
+class IndexStats:
+    hits: int = 0
+    loads: int = 0
+    evictions: int = 0
+    last_load_s: float = 0.0
+    total_load_s: float = 0.0
+    resident_bytes: int = 0
+    last_used: float = 0.0
+
+
+def estimate_resident_bytes(vectorstore) -> int:
+    """Flat float32 vectors plus docstore text; close enough to budget against."""
+    index = vectorstore.index
+    size = index.ntotal * index.d * 4
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(doc_id)
+        size += len(doc.page_content.encode("utf-8")) + len(str(doc.metadata))
+    return size
+
+
+def load_index(name: str):
+    """Default loader: S3 (or local fallback) into the index's own directory, plus its calibration."""
+    from tools.embeddings import load_faiss_vectorstore
+    from tools.retrieval_eval import load_relevance_cutoff
+
+    vectorstore = load_faiss_vectorstore(name, get_secret("OPENAI_API_KEY"))
+    return vectorstore, load_relevance_cutoff(resolve_index_location(name)[0])
+
+
+# --- LRU Manager ---
+class IndexManager:
+    """
+    Thread-safe, memory-budgeted LRU of loaded indexes.
+
+    `loader(name)` returns (vectorstore, relevance_cutoff). Loads run outside the LRU
+    lock, so a slow cold load never blocks sessions querying indexes already in memory;
+    concurrent first queries for the same index share one load.
+    """
+
+    def __init__(self, loader=load_index, memory_budget_mb=None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(get_secret("INDEX_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.loader = loader
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._loaded = OrderedDict()   # name → LoadedIndex, least recently used first
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name: str) -> LoadedIndex:
+        with self._lock:
+            stats = self._stats.setdefault(name, IndexStats())
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                stats.hits += 1
+                stats.last_used = time.time()
+                return self._loaded[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:  # another session may have finished loading it meanwhile
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    stats.hits += 1
+                    stats.last_used = time.time()
+                    return self._loaded[name]
+
+            from tools.partitions import PartitionIndex
+
+            start = time.perf_counter()
+            vectorstore, cutoff = self.loader(name)
+            loaded = LoadedIndex(name, vectorstore, PartitionIndex(vectorstore), cutoff, estimate_resident_bytes(vectorstore))
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._loaded[name] = loaded
+                stats.loads += 1
+                stats.last_load_s = elapsed
+                stats.total_load_s += elapsed
+                stats.resident_bytes = loaded.resident_bytes
+                stats.last_used = time.time()
+                self._enforce_budget(keep=name)
+            print(f"📚 Loaded index '{name}' in {elapsed:.2f}s ({loaded.resident_bytes / 1e6:.1f} MB resident)")
+            return loaded
+
+    def _enforce_budget(self, keep):
+        """Evict least recently used indexes until under budget; `keep` always stays."""
+        while self.resident_bytes() > self.memory_budget_bytes:
+            victim = next((name for name in self._loaded if name != keep), None)
+            if victim is None:
+                print(f"⚠️ Index '{keep}' alone exceeds the {self.memory_budget_bytes / 1e6:.0f} MB budget")
+                return
+            self._evict_locked(victim)
+
+    def _evict_locked(self, name):
+        self._loaded.pop(name)
+        stats = self._stats[name]
+        stats.evictions += 1
+        stats.resident_bytes = 0
+        print(f"♻️ Evicted index '{name}' from memory")
+
+    def evict(self, name: str) -> bool:
+        """Drop an index (e.g. after a rebuild) so the next query reloads it."""
+        with self._lock:
+            if name not in self._loaded:
+                return False
+            self._evict_locked(name)
+            return True
+
+    def resident_bytes(self) -> int:
+        return sum(loaded.resident_bytes for loaded in self._loaded.values())
+
+    def loaded(self) -> list:
+        with self._lock:
+            return list(self._loaded)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {**asdict(stats), "loaded": name in self._loaded}
+                for name, stats in self._stats.items()
+            }
@@ -0,0 +1,271 @@
+"""
+Concurrent-session load test for the chat pipeline.
+
+Simulates employees asking questions with think time between turns, drawn from the
+query log (or the golden set when no log exists). Each simulated user runs on its own
+thread, like a Streamlit session's script thread, and drives
+tools.chat_pipeline.answer_question. The OpenAI client is a fake that injects
+latency, embeddings use the hashing backend, and S3 is a LocalStore. Concurrency
+ramps through the given levels. Each level reports throughput, latency percentiles,
+the share of turns that reached the LLM answer path, hard errors and degraded turns
+(an injected failure the pipeline swallowed), and the run ends with the concurrency
+at which throughput stops scaling.
+
+The relevance cutoff is off by default: the hashing embedder scores real questions
+low, and with a cutoff almost every turn would stop at the no-match reply before any
+LLM call. Pass --cutoff calibrated (or a number) to load-test the no-match path too.
+
+    python -m tools.load_test [--levels 1,2,4,8,16,32] [--duration 20] [--think-time 2]
+        [--llm-latency-ms 800] [--error-rate 0.01] [--slo-p95-s 10] [--index-dir DIR]
+        [--cutoff off|calibrated|0.35]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ROLES = ["Program Manager", "General Staff"]
+TENURES = ["New Hire (0–30 days)", "1–6 Months", "6+ Months", "2+ Years"]
+NO_CUTOFF = -1.0  # lowest cosine similarity: every retrieved chunk passes
+MIN_MATCHED_SHARE = 0.5
+
+
+# --- Fake OpenAI ---
+class FakeOpenAI:
+    """
+    Stands in for openai.OpenAI: chat.completions.create sleeps for a log-normal latency.
+
+    Injected failures are counted per thread, since the pipeline swallows most of them;
+    take_failures() returns the count for the calling session's turn and resets it.
+    """
+
+    def __init__(self, latency_ms=800, jitter=0.35, error_rate=0.0, seed=None):
+        self.latency_s = latency_ms / 1000
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._turn = threading.local()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        time.sleep(self._random.lognormvariate(math.log(self.latency_s), self.jitter))
+        if self._random.random() < self.error_rate:
+            self._turn.failures = getattr(self._turn, "failures", 0) + 1
+            raise RuntimeError("Injected OpenAI error")
+
+        prompt = messages[-1]["content"]
+        if "\nChunks:\n" in prompt:  # rerank: pick the first chunk
+            content = prompt.split("Chunk 1:\n", 1)[-1].split("\n\nChunk 2:", 1)[0]
+        else:
+            content = "Based on the handbook, this is how the policy applies to you. Please check with HR for specifics."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def take_failures(self) -> int:
+        failures = getattr(self._turn, "failures", 0)
+        self._turn.failures = 0
+        return failures
+
+
+# --- Workload ---
+def load_question_mix(log_file=REPO_ROOT / "query_logs.csv") -> list:
+    """Questions from the query log (repeats keep their real frequency), else the golden set."""
+    if Path(log_file).exists():
+        with open(log_file, newline="", encoding="utf-8") as f:
+            questions = [row[1] for row in csv.reader(f) if len(row) > 1 and row[1].strip()]
+        if questions:
+            return questions
+    from tools.retrieval_eval import load_golden_set
+    return [item["question"] for item in load_golden_set()]
+
+
+def build_search_index(index_dir=None, cutoff="off"):
+    """
+    PartitionIndex over an existing index, or a fresh hashing-backend index of docs/,
+    plus the relevance cutoff: "off", "calibrated" for this index, or a number.
+    """
+    from langchain_community.vectorstores import FAISS
+    from tools.embedding_backends import get_embedding_backend
+    from tools.loaders import chunk_docx_with_metadata, enrich_pdf_chunks
+    from tools.partitions import PartitionIndex
+    from tools.retrieval_eval import evaluate_index
+
+    embeddings = get_embedding_backend("hashing")
+    if index_dir:
+        vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    else:
+        chunks = enrich_pdf_chunks(str(REPO_ROOT / "docs" / "InnovimEmployeeHandbook.pdf"))
+        try:
+            chunks += chunk_docx_with_metadata(str(REPO_ROOT / "docs" / "innovim_onboarding.docx"))
+        except Exception as e:
+            print(f"⚠️ Skipping orientation guide: {e}")
+        vectorstore = FAISS.from_documents(chunks, embeddings, ids=[chunk.metadata["chunk_id"] for chunk in chunks])
+    if cutoff == "off":
+        cutoff = NO_CUTOFF
+    elif cutoff == "calibrated":
+        with contextlib.redirect_stdout(io.StringIO()):
+            cutoff = evaluate_index(vectorstore, write_calibration=False)["relevance_cutoff"]
+    return PartitionIndex(vectorstore), float(cutoff)
+
+
+# --- Load Generation ---
+@dataclass
+class LevelResult:
+    concurrency: int
+    turns: int
+    matched: int      # turns that got past retrieval and rerank to a drafted answer
+    errors: int       # turns that raised
+    degraded: int     # turns that completed despite an injected LLM failure
+    elapsed_s: float
+    latencies_s: list
+
+    @property
+    def throughput(self):
+        return self.turns / self.elapsed_s if self.elapsed_s else 0.0
+
+    def share(self, count):
+        return count / self.turns if self.turns else 0.0
+
+    @property
+    def error_rate(self):
+        return self.share(self.errors)
+
+    def latency(self, pct):
+        from tools.retrieval_eval import percentile
+        return percentile(self.latencies_s, pct) if self.latencies_s else 0.0
+
+
+def run_level(concurrency, duration_s, think_time_s, questions, search_index, client, cutoff, seed=0) -> LevelResult:
+    from tools.chat_pipeline import PREFERRED_SCOPES, SEARCH_SCOPES, answer_question, default_scope
+    from tools.log_utils import log_query_to_csv
+
+    lock = threading.Lock()
+    latencies, counts = [], {"matched": 0, "errors": 0, "degraded": 0}
+    deadline = time.perf_counter() + duration_s
+
+    def user(user_id):
+        rng = random.Random(seed * 1000 + user_id)
+        profile = {"role": rng.choice(ROLES), "tenure": rng.choice(TENURES)}
+        scope_name = default_scope(profile["tenure"])
+        scope, prefer = SEARCH_SCOPES[scope_name], PREFERRED_SCOPES.get(scope_name)
+        while True:
+            time.sleep(rng.expovariate(1 / think_time_s) if think_time_s > 0 else 0)
+            if time.perf_counter() >= deadline:
+                return
+            question = rng.choice(questions)
+            client.take_failures()
+            start = time.perf_counter()
+            matched, failed = False, False
+            try:
+                answer, matched = answer_question(
+                    question, profile, search_index, client, scope=scope, prefer=prefer, cutoff=cutoff
+                )
+                if not matched:
+                    log_query_to_csv(question, answer)
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            injected = client.take_failures()
+            with lock:
+                latencies.append(elapsed)
+                counts["matched"] += matched
+                counts["errors"] += failed
+                counts["degraded"] += bool(injected) and not failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    with contextlib.redirect_stdout(io.StringIO()):  # keep per-turn log prints out of the report
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return LevelResult(concurrency, len(latencies), elapsed_s=time.perf_counter() - started, latencies_s=latencies, **counts)
+
+
+def find_saturation(results: list, slo_p95_s: float, min_gain=0.10):
+    """Highest level before throughput gains fall under `min_gain` or p95 breaks the SLO."""
+    if not results or results[0].latency(95) > slo_p95_s:
+        return None
+    for previous, current in zip(results, results[1:]):
+        if current.throughput < previous.throughput * (1 + min_gain) or current.latency(95) > slo_p95_s:
+            return previous.concurrency
+    return results[-1].concurrency
+
+
+def run_load_test(levels, duration_s, think_time_s, llm_latency_ms, error_rate, slo_p95_s, index_dir=None, cutoff="off"):
+    from tools.s3_utils import LocalStore, set_store
+
+    workdir = tempfile.mkdtemp(prefix="hr_load_test_")
+    os.environ.setdefault("S3_DOCS_BUCKET", "load-test-docs")
+    set_store(LocalStore(Path(workdir) / "s3"))
+    questions = load_question_mix()
+    search_index, cutoff = build_search_index(index_dir, cutoff)
+    client = FakeOpenAI(latency_ms=llm_latency_ms, error_rate=error_rate)
+    os.chdir(workdir)  # query_logs.csv is written relative to the working directory
+
+    cutoff_label = "off" if cutoff == NO_CUTOFF else f"{cutoff:.3f}"
+    print(
+        f"👥 {len(questions)} questions in the mix, think time {think_time_s}s, "
+        f"fake LLM {llm_latency_ms} ms/call, relevance cutoff {cutoff_label}"
+    )
+    print(
+        f"{'users':>6} {'turns':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+        f"{'matched':>8} {'errors':>7} {'degraded':>9}"
+    )
+    results = []
+    for level, concurrency in enumerate(levels):
+        result = run_level(concurrency, duration_s, think_time_s, questions, search_index, client, cutoff, seed=level)
+        results.append(result)
+        print(
+            f"{concurrency:>6} {result.turns:>6} {result.throughput:>8.2f} {result.latency(50):>7.2f} "
+            f"{result.latency(95):>7.2f} {result.latency(99):>7.2f} "
+            f"{result.share(result.matched):>8.1%} {result.error_rate:>7.1%} {result.share(result.degraded):>9.1%}"
+        )
+
+    if any(result.share(result.matched) < MIN_MATCHED_SHARE for result in results):
+        print(
+            f"⚠️ Under {MIN_MATCHED_SHARE:.0%} of turns reached the LLM answer path at some levels; "
+            "those latencies mostly measure the no-match reply"
+        )
+
+    saturation = find_saturation(results, slo_p95_s)
+    if saturation is None:
+        print(f"❌ p95 latency exceeds the {slo_p95_s}s SLO even at {levels[0]} user(s)")
+    elif saturation == levels[-1]:
+        print(f"✅ Still scaling at {saturation} concurrent users; try higher --levels")
+    else:
+        print(f"📈 Saturates at about {saturation} concurrent users per instance")
+    return results, saturation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent chat sessions against the pipeline.")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="comma-separated concurrent user counts")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between a user's questions")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="median fake OpenAI latency per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake OpenAI calls that fail")
+    parser.add_argument("--slo-p95-s", type=float, default=10.0, help="p95 turn latency considered saturated")
+    parser.add_argument("--index-dir", default=None, help="existing hashing-backend index (default: build from docs/)")
+    parser.add_argument("--cutoff", default="off", help="relevance cutoff: off, calibrated, or a cosine similarity")
+    args = parser.parse_args()
+
+    run_load_test(
+        [int(level) for level in args.levels.split(",")],
+        args.duration,
+        args.think_time,
+        args.llm_latency_ms,
+        args.error_rate,
+        args.slo_p95_s,
+        args.index_dir,
+        args.cutoff,
+    )
@@ -1,57 +1,57 @@
+from functools import lru_cache
+from pathlib import Path
 from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
-import re
+from tools.chunking import chunk_documents, count_tokens
+from tools.partitions import stamp_partition
+
+NLTK_DATA_DIR = Path(__file__).resolve().parent.parent / "nltk_data"
+HANDBOOK_KEYWORDS = "Keywords: vacation, PTO, benefits, remote work, telecommute, timecard, leave, supervisor, holiday, HR, policy."
+
+@lru_cache(maxsize=1)
+def ensure_nltk_resources(resources=("punkt", "averaged_perceptron_tagger")):
+    """Make the NLTK data used by the DOCX loader available, once per process."""
+    import nltk
+
+    if str(NLTK_DATA_DIR) not in nltk.data.path:
+        nltk.data.path.insert(0, str(NLTK_DATA_DIR))
+    for res in resources:
+        try:
+            nltk.data.find(f'tokenizers/{res}' if 'punkt' in res else f'taggers/{res}')
+        except LookupError:
+            nltk.download(res, quiet=True)
+
+def load_document(path: str) -> list:
+    """Load a PDF or DOCX file into page documents."""
+    if str(path).endswith(".pdf"):
+        return PyPDFLoader(str(path)).load()
+    if str(path).endswith(".docx"):
+        ensure_nltk_resources()
+        return UnstructuredWordDocumentLoader(str(path)).load()
+    raise ValueError(f"Unsupported document type: {path}")
 
 def enrich_pdf_chunks(pdf_path: str) -> list:
-    loader = PyPDFLoader(pdf_path)
-    raw_pages = loader.load()
-    enriched_chunks = []
-
-    section_pattern = re.compile(r"\n?(\d{3,4}\s+[A-Z][^\n]{3,}|[A-Z][A-Za-z\s]+\n)")
-
-    for page_num, page in enumerate(raw_pages):
-        text = page.page_content
-        matches = list(section_pattern.finditer(text))
-        positions = [m.start() for m in matches]
-
-        if not positions:
-            enriched_chunks.append(Document(
-                page_content=text.strip(),
-                metadata={"source": f"employee_handbook_page_{page_num + 1}"}
-            ))
+    raw_pages = stamp_partition(load_document(pdf_path), "employee_handbook", Path(pdf_path).name)
+    # The chunker budgets for the bare title line; reserve room for the rest of the header
+    enriched_chunks = chunk_documents(raw_pages, reserved_tokens=count_tokens(f"SECTION: \n{HANDBOOK_KEYWORDS}\n\n"))
+
+    for chunk in enriched_chunks:
+        chunk.metadata["source"] = f"employee_handbook_page_{chunk.metadata['page'] + 1}"
+        title = chunk.metadata["section_title"]
+        if not title:
             continue
-
-        positions.append(len(text))  # end of last section
-
-        for i in range(len(positions) - 1):
-            chunk_text = text[positions[i]:positions[i + 1]].strip()
-            title_line = chunk_text.split("\n")[0].strip()
-            title = re.sub(r"[^\w\s:]", "", title_line)
-
-            enriched_text = (
-                f"SECTION: {title}\n"
-                f"Keywords: vacation, PTO, benefits, remote work, telecommute, timecard, leave, supervisor, holiday, HR, policy.\n\n"
-                f"{chunk_text}"
-            )
-
-            enriched_chunks.append(Document(
-                page_content=enriched_text,
-                metadata={
-                    "source": f"employee_handbook_page_{page_num + 1}",
-                    "section_title": title
-                }
-            ))
+        body = chunk.page_content.removeprefix(f"{title}\n")  # chunker leads with the bare title
+        chunk.page_content = (
+            f"SECTION: {title}\n"
+            f"{HANDBOOK_KEYWORDS}\n\n"
+            f"{body}"
+        )
 
     return enriched_chunks
 
 def chunk_docx_with_metadata(docx_path: str) -> list:
-    loader = UnstructuredWordDocumentLoader(docx_path)
-    docs = loader.load()
-
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-    chunks = splitter.split_documents(docs)
+    docs = stamp_partition(load_document(docx_path), "orientation_guide", Path(docx_path).name)
+    chunks = chunk_documents(docs)
 
     for chunk in chunks:
         chunk.metadata["source"] = "orientation_guide"
-    return chunks
\ No newline at end of file
+    return chunks
@@ -1,12 +1,17 @@
 import csv
 from datetime import datetime
+import io
 import os
-import streamlit as st
+import threading
+from tools.config import get_secret
 from tools.s3_utils import download_file_from_s3, upload_file_to_s3
 
 LOG_FILE = "query_logs.csv"
-S3_BUCKET = st.secrets["S3_DOCS_BUCKET"]
+S3_BUCKET = get_secret("S3_DOCS_BUCKET")
 S3_KEY = f"logs/{LOG_FILE}"  # <- Keeps log files separated in the bucket
+_log_lock = threading.Lock()  # sessions run on separate script threads and append to one file
+_upload_lock = threading.Lock()  # one PUT at a time, so S3 never ends on an older copy
+_snapshots = {"taken": 0, "uploaded": 0}
 
 def ensure_log_file_exists():
     """Check if the log file exists locally. If not, download from S3."""
@@ -18,12 +23,27 @@ def ensure_log_file_exists():
             print(f"[LOG] No existing log on S3 or error downloading: {e}")
 
 def log_query_to_csv(user_input: str, response: str):
-    """Append a query and response to the log file and upload to S3."""
-    with open(LOG_FILE, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow([datetime.now().isoformat(), user_input.strip(), response.strip()])
-    try:
-        upload_file_to_s3(LOG_FILE, S3_KEY, S3_BUCKET)
-        print(f"[LOG] Uploaded updated log to S3.")
-    except Exception as e:
-        print(f"[LOG] Failed to upload log to S3: {e}")
\ No newline at end of file
+    """
+    Append a query and response to the log file and upload to S3.
+
+    The append and a snapshot of the whole file happen under the log lock; the upload
+    runs outside it, one at a time, and skips snapshots older than one already uploaded.
+    """
+    with _log_lock:
+        with open(LOG_FILE, "a", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow([datetime.now().isoformat(), user_input.strip(), response.strip()])
+        with open(LOG_FILE, "rb") as f:
+            snapshot = f.read()
+        _snapshots["taken"] += 1
+        version = _snapshots["taken"]
+
+    with _upload_lock:
+        if version < _snapshots["uploaded"]:
+            return  # a newer snapshot, which includes this row, is already on S3
+        try:
+            upload_file_to_s3(io.BytesIO(snapshot), S3_KEY, S3_BUCKET)
+            _snapshots["uploaded"] = version
+            print(f"[LOG] Uploaded updated log to S3.")
+        except Exception as e:
+            print(f"[LOG] Failed to upload log to S3: {e}")
\ No newline at end of file
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+
+# --- Partitions (where a chunk came from) ---
+PARTITIONS = {
+    "employee_handbook": "Employee handbook",
+    "orientation_guide": "Orientation guide",
+    "uploads": "Uploaded documents",
+}
+
+
+def infer_partition(name: str, default="uploads") -> str:
+    """Map a file name or legacy `source` value to its partition."""
+    name = name.lower()
+    if "handbook" in name:
+        return "employee_handbook"
+    if "orientation" in name or "onboarding" in name:
+        return "orientation_guide"
+    return default
+
+
+def stamp_partition(docs: list, partition: str, document: str, uploaded_at=None) -> list:
+    """Record partition, document and upload date on loaded pages; chunks inherit them."""
+    for doc in docs:
+        doc.metadata["partition"] = partition
+        doc.metadata["document"] = document
+        doc.metadata["uploaded_at"] = uploaded_at.isoformat() if isinstance(uploaded_at, datetime) else uploaded_at
+    return docs
+
+
+def _as_date(value):
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return datetime.fromisoformat(str(value)).date()
+
+
+# --- Filtered Search ---
+class PartitionIndex:
+    """
+    Metadata → FAISS row map built from a loaded vectorstore's docstore.
+
+    Filters are resolved to a set of row IDs before searching, and FAISS only scores
+    those rows (IDSelectorBatch), so a scoped query never over-fetches and discards.
+    """
+
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+        self.rows = {"partition": defaultdict(set), "document": defaultdict(set), "section_title": defaultdict(set)}
+        self.uploaded = []  # (date, row) for uploaded chunks
+
+        for row, doc_id in vectorstore.index_to_docstore_id.items():
+            meta = vectorstore.docstore.search(doc_id).metadata
+            partition = meta.get("partition") or infer_partition(meta.get("source", ""))
+            self.rows["partition"][partition].add(row)
+            self.rows["document"][meta.get("document") or Path(meta.get("source", "")).name].add(row)
+            self.rows["section_title"][meta.get("section_title", "")].add(row)
+            if meta.get("uploaded_at"):
+                self.uploaded.append((_as_date(meta["uploaded_at"]), row))
+
+    def partitions(self) -> dict:
+        return {name: len(rows) for name, rows in self.rows["partition"].items()}
+
+    def _matching(self, field, needle):
+        needle = needle.lower()
+        matched = set()
+        for value, rows in self.rows[field].items():
+            if needle in value.lower():
+                matched |= rows
+        return matched
+
+    def select(self, source=None, document=None, section=None, uploaded_after=None, uploaded_before=None):
+        """Row IDs matching every given filter, or None when no filter is set."""
+        selected = None
+
+        def narrow(rows):
+            nonlocal selected
+            selected = rows if selected is None else selected & rows
+
+        if source:
+            sources = [source] if isinstance(source, str) else source
+            narrow(set().union(*(self.rows["partition"].get(s, set()) for s in sources)))
+        if document:
+            narrow(self._matching("document", document))
+        if section:
+            narrow(self._matching("section_title", section))
+        if uploaded_after or uploaded_before:
+            after, before = _as_date(uploaded_after), _as_date(uploaded_before)
+            narrow({
+                row for day, row in self.uploaded
+                if (after is None or day >= after) and (before is None or day <= before)
+            })
+        return selected
+
+    def search(self, query: str, k: int = 3, **filters) -> list:
+        """Like similarity_search_with_score, restricted to chunks matching `filters`."""
+        import faiss
+        import numpy as np
+
+        rows = self.select(**filters)
+        if rows is None:
+            return self.vectorstore.similarity_search_with_score(query, k=k)
+        if not rows:
+            return []
+
+        vector = np.array([self.vectorstore._embed_query(query)], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vector)
+        selector = faiss.IDSelectorBatch(np.fromiter(rows, dtype=np.int64, count=len(rows)))
+        scores, indices = self.vectorstore.index.search(vector, min(k, len(rows)), params=faiss.SearchParameters(sel=selector))
+
+        results = []
+        for score, row in zip(scores[0], indices[0]):
+            if row == -1:
+                continue
+            doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[row])
+            results.append((doc, float(score)))
+        return results
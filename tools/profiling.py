@@ -0,0 +1,185 @@
+"""
+On-demand profiling of a running worker, started from the admin tools.
+
+A capture samples every thread's stack (sys._current_frames) on a background thread
+and records tracemalloc snapshots, for either the next N chat turns or a fixed time
+window. When it ends it writes to profiles/<timestamp>/:
+
+    stacks.collapsed   flamegraph-compatible ("frame;frame;frame count"), e.g.
+                       flamegraph.pl stacks.collapsed > flame.svg, or load in speedscope
+    allocations.txt    top allocation lines that grew during the capture
+
+Nothing is installed while no capture runs; the chat path only reads one global.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+PROFILES_DIR = Path("profiles")
+SAMPLE_INTERVAL_S = 0.005       # ~200 Hz
+MAX_STACK_DEPTH = 128
+MAX_CAPTURE_SECONDS = 900       # turn-based captures stop here even if turns never arrive
+TRACEMALLOC_FRAMES = 1         # tracing slows every allocation in the worker, more with each frame kept
+TOP_ALLOCATIONS = 30
+
+# Innermost frames of threads that are just waiting; sampling them only hides the hot path
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+_active = None
+_lock = threading.Lock()
+
+
+# --- Capture ---
+class ProfileCapture:
+    def __init__(self, turns=None, seconds=None, interval=SAMPLE_INTERVAL_S):
+        if not turns and not seconds:
+            raise ValueError("Profile either a number of turns or a time window")
+        self.turns = turns
+        self.turns_left = turns
+        self.seconds = seconds or MAX_CAPTURE_SECONDS
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.output_dir = None
+        self._labels = {}
+        self._stop = threading.Event()
+        self._finished = threading.Lock()
+        self._thread = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self.started_at = datetime.now()
+        self._start = time.monotonic()
+        self._thread.start()
+
+    def status(self) -> str:
+        elapsed = time.monotonic() - self._start
+        if self.turns:
+            return f"Profiling: {self.turns - self.turns_left}/{self.turns} turns, {elapsed:.0f}s, {self.samples} samples"
+        return f"Profiling: {elapsed:.0f}/{self.seconds:.0f}s, {self.samples} samples"
+
+    def turn_finished(self):
+        if self.turns_left is None:
+            return
+        with _lock:  # sessions finish turns concurrently
+            self.turns_left -= 1
+            done = self.turns_left == 0
+        if done:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        self._finish()
+
+    # --- Sampling thread ---
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{Path(code.co_filename).name}:{code.co_name}"
+        return label
+
+    def _sample(self):
+        own = threading.get_ident()
+        deadline = self._start + self.seconds
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+        self._finish()
+
+    # --- Artifacts ---
+    def _finish(self):
+        global _active
+        if not self._finished.acquire(blocking=False):
+            return  # the sampler and stop() both land here; write once
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        self.output_dir = PROFILES_DIR / self.started_at.strftime("%Y%m%d-%H%M%S")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.output_dir / "stacks.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(self.output_dir / "allocations.txt", "w", encoding="utf-8") as f:
+            f.write(self._allocation_report(snapshot, current, peak))
+
+        with _lock:
+            if _active is self:
+                _active = None
+        print(f"⏱ Profile saved to '{self.output_dir}/' ({self.samples} samples)")
+
+    def _allocation_report(self, snapshot, current, peak) -> str:
+        duration = time.monotonic() - self._start
+        lines = [
+            f"Capture started {self.started_at:%Y-%m-%d %H:%M:%S}, {duration:.1f}s, {self.samples} samples",
+            f"Turns profiled: {self.turns - max(self.turns_left, 0)}" if self.turns else f"Window: {self.seconds:.0f}s",
+            f"Traced memory: {current / 1e6:.2f} MB now, {peak / 1e6:.2f} MB peak",
+            "",
+            f"Top {TOP_ALLOCATIONS} allocation sites by growth during the capture:",
+        ]
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diffs = snapshot.filter_traces(filters).compare_to(self._baseline.filter_traces(filters), "traceback")
+        for rank, diff in enumerate(diffs[:TOP_ALLOCATIONS], start=1):
+            lines.append(f"#{rank}: {diff.size_diff / 1024:+.1f} KiB ({diff.count_diff:+d} blocks), {diff.size / 1024:.1f} KiB live")
+            lines.extend(f"    {line}" for line in diff.traceback.format(most_recent_first=True))
+        return "\n".join(lines) + "\n"
+
+
+# --- Process-wide Control ---
+def active_capture():
+    """The running capture, or None. This is the only profiling cost on the chat path."""
+    return _active
+
+
+def start_capture(turns=None, seconds=None) -> ProfileCapture:
+    global _active
+    with _lock:
+        if _active is not None:
+            raise RuntimeError("A profile capture is already running")
+        _active = ProfileCapture(turns=turns, seconds=seconds)
+        _active.start()
+        return _active
+
+
+def stop_capture():
+    capture = _active
+    if capture is not None:
+        capture.stop()
+    return capture
+
+
+def list_captures(limit=5) -> list:
+    """Most recent capture directories first."""
+    if not PROFILES_DIR.exists():
+        return []
+    return sorted((path for path in PROFILES_DIR.iterdir() if path.is_dir()), reverse=True)[:limit]
@@ -0,0 +1,120 @@
+"""
+Server-side cost of app.py reruns that make no LLM calls.
+
+Runs the app headless with streamlit.testing.v1.AppTest as an onboarded user and
+times repeated reruns for a fresh session and for a long one (a full history window
+plus a rolling summary). Storage is a throwaway LocalStore, so nothing touches S3 or
+OpenAI.
+
+AppTest always executes the whole script, which is what a sidebar interaction costs.
+Each @st.fragment body is timed as well: that is the server-side cost of an
+interaction inside the fragment (submitting a question reruns only chat_pane). Pass
+--app with a previous revision of app.py to compare, e.g.:
+
+    git show <revision>:app.py > /tmp/app_before.py
+    python -m tools.rerun_bench [--app /tmp/app_before.py] [--runs 30]
+"""
+import argparse
+import contextlib
+import functools
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PROFILE = {"role": "General Staff", "tenure": "6+ Months"}
+SECRETS = {"OPENAI_API_KEY": "sk-rerun-bench", "ADMIN_CODE": "rerun-bench", "S3_DOCS_BUCKET": "rerun-bench"}
+
+
+def long_history(turns=6):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Sample question {i} about PTO and remote work?"})
+        history.append({"role": "assistant", "content": "Per the handbook, this is how the policy applies. " * 6})
+    return history
+
+
+def make_app(app_path, history=None):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(app_path), default_timeout=60)
+    at.secrets.update(SECRETS)
+    at.session_state["user_profile"] = dict(PROFILE)
+    if history:
+        at.session_state["chat_history"] = history
+        at.session_state["history_summary"] = "\n".join(f"Q: Earlier question {i} → A: Earlier answer." for i in range(10))
+        at.session_state["folded_messages"] = 20
+    return at
+
+
+@contextlib.contextmanager
+def timed_fragments():
+    """Wrap st.fragment so every fragment body records its run time (ms) by function name."""
+    import streamlit
+
+    timings = defaultdict(list)
+    real_fragment = streamlit.fragment
+
+    def fragment(func=None, **kwargs):
+        if func is None:
+            return lambda f: fragment(f, **kwargs)
+
+        @functools.wraps(func)
+        def timed(*args, **kw):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kw)
+            finally:
+                timings[func.__name__].append((time.perf_counter() - start) * 1000)
+
+        return real_fragment(timed, **kwargs)
+
+    with mock.patch.object(streamlit, "fragment", fragment):
+        yield timings
+
+
+def time_reruns(at, runs) -> dict:
+    with timed_fragments() as fragments:
+        at.run()  # first run pays for imports and cache_resource initialisation
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        fragments.clear()
+        timings = {"full rerun": []}
+        for _ in range(runs):
+            start = time.perf_counter()
+            at.run()
+            timings["full rerun"].append((time.perf_counter() - start) * 1000)
+    timings.update({f"{name} fragment": values for name, values in fragments.items()})
+    return timings
+
+
+def run_bench(app_path, runs):
+    from tools.retrieval_eval import percentile
+
+    workdir = tempfile.mkdtemp(prefix="hr_rerun_bench_")
+    os.environ.setdefault("STORAGE_BACKEND", "local")
+    os.environ.setdefault("LOCAL_STORE_ROOT", str(Path(workdir) / "s3"))
+    os.chdir(REPO_ROOT)  # the app loads assets/ relative to the working directory
+
+    print(f"⏱ Rerun cost of {app_path} ({runs} runs each, no LLM calls)")
+    results = {}
+    for session, history in [("fresh session", None), ("long session", long_history())]:
+        results[session] = time_reruns(make_app(app_path, history), runs)
+        print(f"   {session}")
+        for name, timings in results[session].items():
+            print(f"      {name:<26} p50 {percentile(timings, 50):6.1f} ms  p95 {percentile(timings, 95):6.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure server-side rerun cost of the Streamlit app.")
+    parser.add_argument("--app", default=str(REPO_ROOT / "app.py"))
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    run_bench(Path(args.app).resolve(), args.runs)
@@ -0,0 +1,280 @@
+"""
+Offline retrieval quality and latency evaluation against a golden question set.
+
+Reports recall@k, MRR and per-query search latency for each retriever configuration,
+and calibrates the relevance cutoff the app applies to search results (as cosine
+similarity, not raw FAISS distance).
+
+    python -m tools.retrieval_eval --index-dir faiss_index [--backend hashing]
+        [--min-recall 0.6] [--max-p95-ms 50] [--write-calibration]
+"""
+import argparse
+import copy
+import json
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+
+GOLDEN_SET_PATH = Path(__file__).resolve().parent.parent / "eval" / "golden_questions.json"
+CALIBRATION_FILE = "calibration.json"
+RECALL_AT = (1, 3, 5)
+
+# ada-002 cosine similarity rarely drops below ~0.7 even for unrelated text,
+# so this only removes clear misses until a calibrated cutoff exists.
+DEFAULT_RELEVANCE_CUTOFF = 0.7
+
+# The app keeps the top APP_TOP_K hits above the cutoff and lets the GPT reranker pick;
+# the cutoff is set so it still passes this share of the relevant hits among them.
+APP_TOP_K = 3
+CALIBRATION_RECALL_TARGET = 0.9
+
+# A rebuild is not published when flat recall@3 drops by more than this, or p95 search
+# latency grows past this factor (plus slack, since sub-millisecond timings are noisy)
+REGRESSION_RECALL_DROP = 0.05
+REGRESSION_P95_FACTOR = 2.0
+REGRESSION_P95_SLACK_MS = 5.0
+
+
+class RetrievalRegression(Exception):
+    """A rebuilt index scored worse on the golden set than the one it replaces."""
+
+
+# --- Score Conversion ---
+def to_similarity(vectorstore, score: float) -> float:
+    """
+    Convert a FAISS score to cosine similarity (higher is better).
+
+    The default index returns squared L2 distance; for unit vectors (every backend we
+    ship normalizes) cosine similarity = 1 - d² / 2. Inner-product indexes already
+    return the similarity.
+    """
+    strategy = getattr(vectorstore, "distance_strategy", None)
+    if strategy is not None and getattr(strategy, "value", strategy) == "MAX_INNER_PRODUCT":
+        return float(score)
+    return 1.0 - float(score) / 2.0
+
+
+def read_calibration(index_dir):
+    calibration_file = Path(index_dir) / CALIBRATION_FILE
+    if not calibration_file.exists():
+        return None
+    with open(calibration_file) as f:
+        return json.load(f)
+
+
+def load_relevance_cutoff(index_dir, default=DEFAULT_RELEVANCE_CUTOFF) -> float:
+    return (read_calibration(index_dir) or {}).get("relevance_cutoff", default)
+
+
+def mark_unevaluated(index_dir, reason: str):
+    """Replace a calibration left from the previous index, so its cutoff is not applied to this one."""
+    with open(Path(index_dir) / CALIBRATION_FILE, "w") as f:
+        json.dump({"evaluated": False, "reason": reason}, f, indent=2)
+    print(f"⚠️ Index not evaluated ({reason}); the app will use the default relevance cutoff")
+
+
+# --- Golden Set ---
+def load_golden_set(path=GOLDEN_SET_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_relevant(doc, item: dict) -> bool:
+    title = " ".join(doc.metadata.get("section_title", "").split()).lower()
+    text = " ".join(doc.page_content.split()).lower()
+    return (
+        any(section.lower() in title for section in item.get("expected_sections", []))
+        or any(snippet.lower() in text for snippet in item.get("expected_text", []))
+    )
+
+
+# --- Retriever Configurations ---
+def default_retrievers(vectorstore) -> dict:
+    """name → fn(item, k) returning [(doc, score)]."""
+    from tools.partitions import PartitionIndex
+
+    partition_index = PartitionIndex(vectorstore)
+    return {
+        "flat": lambda item, k: vectorstore.similarity_search_with_score(item["question"], k=k),
+        "partition-scoped": lambda item, k: partition_index.search(item["question"], k=k, source=item.get("partition")),
+    }
+
+
+# --- Evaluation ---
+def with_private_query_cache(vectorstore):
+    """
+    Shallow copy of the vectorstore whose embedder has its own empty query cache, so
+    latencies include embedding the question and live sessions keep their cache.
+    """
+    embeddings = vectorstore.embedding_function
+    if not hasattr(embeddings, "fresh_copy"):
+        return vectorstore
+    isolated = copy.copy(vectorstore)
+    isolated.embedding_function = embeddings.fresh_copy()
+    return isolated
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def evaluate_retriever(vectorstore, retrieve, golden: list, k: int = 5) -> dict:
+    """labelled_scores holds (similarity, relevant, rank, question index) for every hit."""
+    ranks, latencies, labelled = [], [], []
+    for question_index, item in enumerate(golden):
+        start = time.perf_counter()
+        results = retrieve(item, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rank = None
+        for position, (doc, score) in enumerate(results, start=1):
+            relevant = is_relevant(doc, item)
+            labelled.append((to_similarity(vectorstore, score), relevant, position, question_index))
+            if relevant and rank is None:
+                rank = position
+        ranks.append(rank)
+
+    report = {f"recall@{n}": sum(1 for r in ranks if r and r <= n) / len(golden) for n in RECALL_AT if n <= k}
+    report.update({
+        "mrr": sum(1 / r for r in ranks if r) / len(golden),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+        "misses": [item["question"] for item, r in zip(golden, ranks) if not r],
+        "labelled_scores": labelled,
+    })
+    return report
+
+
+def calibrate_cutoff(labelled_scores: list, k=APP_TOP_K, recall_target=CALIBRATION_RECALL_TARGET, default=DEFAULT_RELEVANCE_CUTOFF) -> float:
+    """Highest similarity cutoff that keeps `recall_target` of the relevant hits in the top k."""
+    relevant = sorted(score for score, is_relevant, rank, _ in labelled_scores if is_relevant and rank <= k)
+    if not relevant:
+        return default
+    keep = math.ceil(recall_target * len(relevant))
+    return math.floor(relevant[len(relevant) - keep] * 1e4) / 1e4  # round down so the boundary hit stays
+
+
+def unanswered_questions(labelled_scores: list, n_questions: int, cutoff: float, k=APP_TOP_K) -> int:
+    """Questions that would reach the reranker with no chunk at all."""
+    answered = {question for score, _, rank, question in labelled_scores if rank <= k and score >= cutoff}
+    return n_questions - len(answered)
+
+
+def evaluate_index(vectorstore, index_dir=None, k=5, golden_path=GOLDEN_SET_PATH, write_calibration=True) -> dict:
+    """Evaluate every retriever configuration, print a report and save the calibrated cutoff."""
+    golden = load_golden_set(golden_path)
+    reports = {}
+    for name in default_retrievers(vectorstore):
+        isolated = with_private_query_cache(vectorstore)  # each configuration embeds every question itself
+        reports[name] = evaluate_retriever(isolated, default_retrievers(isolated)[name], golden, max(k, APP_TOP_K))
+
+    print(f"🧪 Retrieval evaluation on {len(golden)} golden questions (k={k})")
+    for name, report in reports.items():
+        recalls = "  ".join(f"{key} {value:.2f}" for key, value in report.items() if key.startswith("recall@"))
+        print(f"   {name:<17} {recalls}  MRR {report['mrr']:.2f}  p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms")
+        for question in report["misses"]:
+            print(f"      ✗ {question}")
+
+    labelled = reports["flat"]["labelled_scores"]
+    cutoff = calibrate_cutoff(labelled)
+    empty = unanswered_questions(labelled, len(golden), cutoff)
+    print(
+        f"🎯 Calibrated relevance cutoff (cosine similarity): {cutoff} "
+        f"(keeps {CALIBRATION_RECALL_TARGET:.0%} of relevant top-{APP_TOP_K} hits; {empty}/{len(golden)} questions left without a chunk)"
+    )
+
+    if index_dir and write_calibration:
+        summary = {name: {key: value for key, value in report.items() if key not in ("labelled_scores", "misses")} for name, report in reports.items()}
+        with open(Path(index_dir) / CALIBRATION_FILE, "w") as f:
+            json.dump({
+                "relevance_cutoff": cutoff,
+                "metric": "cosine_similarity",
+                "calibration_k": APP_TOP_K,
+                "recall_target": CALIBRATION_RECALL_TARGET,
+                "k": k,
+                "retrievers": summary,
+            }, f, indent=2)
+        print(f"💾 Saved {CALIBRATION_FILE} to '{index_dir}/'")
+
+    return {"relevance_cutoff": cutoff, "retrievers": reports}
+
+
+def evaluate_on_upload_enabled() -> bool:
+    """Admin uploads run the golden set (it embeds every question) unless EVALUATE_ON_UPLOAD=false."""
+    from tools.config import get_secret
+    return str(get_secret("EVALUATE_ON_UPLOAD", "true")).lower() in ("1", "true", "yes")
+
+
+def find_regressions(previous, reports: dict) -> list:
+    """Flat-retriever recall@3 and p95 latency compared with the previous index's calibration."""
+    before = ((previous or {}).get("retrievers") or {}).get("flat")
+    after = reports["flat"]
+    if not before:
+        return []
+    regressions = []
+    if "recall@3" in before and after["recall@3"] < before["recall@3"] - REGRESSION_RECALL_DROP:
+        regressions.append(f"recall@3 fell from {before['recall@3']:.2f} to {after['recall@3']:.2f}")
+    if "p95_ms" in before and after["p95_ms"] > before["p95_ms"] * REGRESSION_P95_FACTOR + REGRESSION_P95_SLACK_MS:
+        regressions.append(f"p95 search latency rose from {before['p95_ms']:.1f} ms to {after['p95_ms']:.1f} ms")
+    return regressions
+
+
+def evaluate_after_rebuild(vectorstore, index_dir):
+    """
+    Rebuild hook: evaluate, write the calibration and list regressions against the
+    calibration it replaces under "regressions". When the suite cannot run, the old
+    calibration is replaced rather than kept with an index it was not measured on.
+    """
+    if not GOLDEN_SET_PATH.exists():
+        mark_unevaluated(index_dir, "no golden set")
+        return None
+    previous = read_calibration(index_dir)
+    try:
+        result = evaluate_index(vectorstore, index_dir)
+    except Exception as e:
+        mark_unevaluated(index_dir, f"evaluation failed: {e}")
+        return None
+    result["regressions"] = find_regressions(previous, result["retrievers"])
+    for regression in result["regressions"]:
+        print(f"❌ Regression: {regression}")
+    return result
+
+
+def raise_on_regression(evaluation):
+    """Stop a rebuild before it is published when evaluate_after_rebuild found a regression."""
+    regressions = (evaluation or {}).get("regressions")
+    if regressions:
+        raise RetrievalRegression("; ".join(regressions))
+
+
+if __name__ == "__main__":
+    from langchain_community.vectorstores import FAISS
+    from tools.embedding_backends import get_embedding_backend, verify_index_metadata
+
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency on the golden question set.")
+    parser.add_argument("--index-dir", default="faiss_index")
+    parser.add_argument("--backend", default=None, help="embedding backend (defaults to EMBEDDING_BACKEND)")
+    parser.add_argument("--golden", default=str(GOLDEN_SET_PATH))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=None, help="fail if flat recall@3 falls below this")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail if flat p95 search latency exceeds this")
+    parser.add_argument("--write-calibration", action="store_true")
+    args = parser.parse_args()
+
+    embeddings = get_embedding_backend(args.backend)
+    vectorstore = FAISS.load_local(args.index_dir, embeddings, allow_dangerous_deserialization=True)
+    verify_index_metadata(args.index_dir, embeddings, vectorstore.index.d)
+    result = evaluate_index(vectorstore, args.index_dir, args.k, args.golden, args.write_calibration)
+
+    flat = result["retrievers"]["flat"]
+    failures = []
+    if args.min_recall is not None and flat.get("recall@3", 0) < args.min_recall:
+        failures.append(f"recall@3 {flat['recall@3']:.2f} < {args.min_recall}")
+    if args.max_p95_ms is not None and flat["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 {flat['p95_ms']:.1f} ms > {args.max_p95_ms} ms")
+    for failure in failures:
+        print(f"❌ Regression: {failure}")
+    sys.exit(1 if failures else 0)
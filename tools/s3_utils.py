@@ -1,45 +1,177 @@
-import boto3
-import streamlit as st
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import uuid
+from tools.config import get_secret
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-    aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-    region_name=st.secrets["AWS_REGION"]
-)
+# --- Connection & Transfer Tuning ---
+S3_MAX_POOL_CONNECTIONS = 32
+S3_RETRIES = {"max_attempts": 5, "mode": "adaptive"}
+S3_CONNECT_TIMEOUT = 5
+S3_READ_TIMEOUT = 60
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+TRANSFER_MAX_CONCURRENCY = 8
 
+
+class StorageError(Exception):
+    """A storage backend could not complete a transfer (missing object, network, credentials)."""
+
+
+class S3Store:
+    """S3 backend sharing one pooled, thread-safe client across the whole process."""
+
+    def __init__(self, client=None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        self._errors = (BotoCoreError, ClientError)
+        if client is None:
+            config = Config(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                retries=S3_RETRIES,
+                connect_timeout=S3_CONNECT_TIMEOUT,
+                read_timeout=S3_READ_TIMEOUT,
+            )
+            # Explicit keys from secrets when present, otherwise boto3's default credential chain
+            session = boto3.session.Session(
+                aws_access_key_id=get_secret("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=get_secret("AWS_SECRET_ACCESS_KEY"),
+                region_name=get_secret("AWS_REGION"),
+            )
+            client = session.client("s3", config=config)
+        self.client = client
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=TRANSFER_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except self._errors as e:
+            raise StorageError(str(e)) from e
+
+    def upload_file(self, local_path, bucket, key):
+        self._call(self.client.upload_file, str(local_path), bucket, key, Config=self.transfer_config)
+
+    def upload_fileobj(self, file_obj, bucket, key):
+        self._call(self.client.upload_fileobj, file_obj, bucket, key, Config=self.transfer_config)
+
+    def download_file(self, bucket, key, local_path):
+        self._call(self.client.download_file, bucket, key, str(local_path), Config=self.transfer_config)
+
+    def list_objects(self, bucket, prefix=""):
+        """All objects under `prefix` as dicts with Key, LastModified and Size (paginated)."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        objects = []
+        for page in self._call(lambda: list(paginator.paginate(Bucket=bucket, Prefix=prefix))):
+            objects.extend(page.get("Contents", []))
+        return objects
+
+
+class LocalStore:
+    """Filesystem stand-in for S3: each bucket is a directory under `root`."""
+
+    def __init__(self, root=".local_s3"):
+        self.root = Path(root)
+
+    def _path(self, bucket, key):
+        return self.root / bucket / key
+
+    def upload_file(self, local_path, bucket, key):
+        dest = self._path(bucket, key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, dest)
+
+    def upload_fileobj(self, file_obj, bucket, key):
+        dest = self._path(bucket, key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "wb") as f:
+            shutil.copyfileobj(file_obj, f)
+
+    def download_file(self, bucket, key, local_path):
+        src = self._path(bucket, key)
+        if not src.is_file():
+            raise StorageError(f"No such key: {bucket}/{key}")
+        shutil.copyfile(src, local_path)
+
+    def list_objects(self, bucket, prefix=""):
+        from datetime import datetime, timezone
+
+        base = self.root / bucket
+        if not base.exists():
+            return []
+        objects = []
+        for path in sorted(base.rglob("*")):
+            key = path.relative_to(base).as_posix()
+            if path.is_file() and key.startswith(prefix):
+                stat = path.stat()
+                objects.append({
+                    "Key": key,
+                    "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                    "Size": stat.st_size,
+                })
+        return objects
+
+
+# --- Process-wide Store ---
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Create the storage backend on first use (STORAGE_BACKEND=s3|local) and reuse it."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if get_secret("STORAGE_BACKEND", "s3") == "local":
+                    _store = LocalStore(get_secret("LOCAL_STORE_ROOT", ".local_s3"))
+                else:
+                    _store = S3Store()
+    return _store
+
+def set_store(store):
+    """Swap the process-wide backend, e.g. a LocalStore in tests."""
+    global _store
+    with _store_lock:
+        _store = store
+
+# --- Helpers ---
 def upload_file_to_s3(file_obj, filename, bucket_name):
-    s3.upload_fileobj(file_obj, bucket_name, filename)
+    """Upload a file object or a local path to `bucket_name/filename`."""
+    if isinstance(file_obj, (str, Path)):
+        get_store().upload_file(file_obj, bucket_name, filename)
+    else:
+        get_store().upload_fileobj(file_obj, bucket_name, filename)
+
+def list_files_in_bucket(bucket_name, prefix=""):
+    return [item["Key"] for item in get_store().list_objects(bucket_name, prefix)]
 
-def list_files_in_bucket(bucket_name):
-    response = s3.list_objects_v2(Bucket=bucket_name)
-    return [item["Key"] for item in response.get("Contents", [])]
+def download_files(bucket, targets: dict):
+    """Download {key: local_path} concurrently over the shared connection pool."""
+    store = get_store()
+    with ThreadPoolExecutor(max_workers=min(len(targets), TRANSFER_MAX_CONCURRENCY) or 1) as pool:
+        futures = [pool.submit(store.download_file, bucket, key, path) for key, path in targets.items()]
+        for future in futures:
+            future.result()
 
 def download_s3_file_to_tmp(bucket, key):
     local_path = f"/tmp/{key.replace('/', '_')}"
-    s3.download_file(bucket, key, local_path)
+    get_store().download_file(bucket, key, local_path)
     return local_path
 
 def download_faiss_index_from_s3(local_path="/tmp/faiss_index"):
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-        aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-        region_name=st.secrets["AWS_REGION"]
-    )
-
     Path(local_path).mkdir(parents=True, exist_ok=True)
-    bucket = st.secrets["S3_INDEX_BUCKET"]
+    bucket = get_secret("S3_INDEX_BUCKET")
     prefix = "faiss_index/"
 
-    response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
-    for obj in response.get("Contents", []):
-        key = obj["Key"]
-        filename = key.split("/")[-1]
-        dest_path = os.path.join(local_path, filename)
-        s3.download_file(bucket, key, dest_path)
+    keys = list_files_in_bucket(bucket, prefix)
+    download_files(bucket, {key: str(Path(local_path) / key.split("/")[-1]) for key in keys})
 
     return local_path
 
@@ -47,5 +179,5 @@ def download_file_from_s3(s3_key, bucket_name, local_path=None):
     """Download a file from S3 to the local project directory (or /tmp)."""
     if local_path is None:
         local_path = s3_key.split("/")[-1]
-    s3.download_file(bucket_name, s3_key, local_path)
+    get_store().download_file(bucket_name, s3_key, local_path)
     return local_path
@@ -0,0 +1,93 @@
+"""
+Cold-start import profile for app.py.
+
+Imports everything app.py imports at module level in a fresh interpreter, subtracts the
+cost of importing Streamlit alone, and fails when the remainder exceeds the budget or a
+module that should load lazily shows up.
+
+    python -m tools.startup_profile [--budget-ms 150] [--runs 5] [--top 10]
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APP_FILE = Path(__file__).resolve().parent.parent / "app.py"
+DEFAULT_BUDGET_MS = 150
+
+# Must never be imported on a cold start; they load on first use
+LAZY_MODULES = ["openai", "langchain", "langchain_community", "faiss", "boto3", "botocore", "nltk", "pandas", "matplotlib"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+
+def app_imports(app_file=APP_FILE) -> list:
+    """Module-level import statements of app.py, as source lines."""
+    tree = ast.parse(Path(app_file).read_text(encoding="utf-8"))
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _run_probe(imports: list, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE.format(imports="\n".join(imports))]
+    result = subprocess.run(cmd, capture_output=True, text=True, cwd=APP_FILE.parent)
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ Import probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def _slowest_imports(importtime_log: str, top: int) -> list:
+    """Top-level entries of `-X importtime` output, slowest cumulative first."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # nested imports are indented
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def profile_startup(budget_ms=DEFAULT_BUDGET_MS, runs=5, top=10) -> bool:
+    imports = app_imports()
+    baseline = min(_run_probe(["import streamlit"])[0]["ms"] for _ in range(runs))
+    samples = [_run_probe(imports)[0] for _ in range(runs)]
+    app_ms = min(sample["ms"] for sample in samples) - baseline
+    loaded = set(samples[0]["modules"])
+    eager = [name for name in LAZY_MODULES if name in loaded]
+
+    print(f"📦 app.py module-level imports: {len(imports)}")
+    print(f"⏱ Streamlit baseline: {baseline:.1f} ms")
+    print(f"⏱ App imports on top of Streamlit: {app_ms:.1f} ms (budget {budget_ms} ms)")
+
+    _, log = _run_probe(imports, importtime=True)
+    print("🐢 Slowest imports (cumulative):")
+    for cumulative_us, name in _slowest_imports(log, top):
+        print(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+    ok = True
+    if eager:
+        print(f"❌ Modules that should load lazily were imported at startup: {', '.join(eager)}")
+        ok = False
+    if app_ms > budget_ms:
+        print(f"❌ Cold-start import budget exceeded by {app_ms - budget_ms:.1f} ms")
+        ok = False
+    if ok:
+        print("✅ Cold start within budget")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile app.py cold-start imports against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(0 if profile_startup(args.budget_ms, args.runs, args.top) else 1)
@@ -1,50 +1,49 @@
 import os
+from datetime import datetime, timezone
 from pathlib import Path
-from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from tools.chunking import chunk_documents
+from tools.config import get_secret
+from tools.dedup import deduplicate, newest_first
+from tools.embedding_backends import get_embedding_backend, get_openai_api_key, verify_index_metadata
+from tools.embeddings import MANIFEST_FILE, load_faiss_vectorstore, save_vectorstore, upload_index_to_s3
+from tools.index_manager import DEFAULT_INDEX, resolve_index_location
+from tools.loaders import load_document
+from tools.partitions import infer_partition, stamp_partition
+from tools.retrieval_eval import evaluate_on_upload_enabled, raise_on_regression
+from tools.s3_utils import get_store
 import tempfile
-import boto3
 import json
 import hashlib
 
-# --- Load API Key ---
-def get_openai_api_key():
-    load_dotenv()
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise ValueError("❌ OPENAI_API_KEY is not set. Please check your .env file or Streamlit secrets.")
-    return key
-
 # --- Build and Save Combined Vectorstore ---
 def build_vectorstore(
     pdf_path="docs/InnovimEmployeeHandbook.pdf",
     docx_path="docs/innovim_onboarding.docx",
     index_path="faiss_index",
-    api_key=None
+    api_key=None,
+    embeddings=None
 ):
     print("🔍 Checking for existing FAISS index...")
     index_file = Path(index_path) / "index.faiss"
 
-    embeddings = OpenAIEmbeddings(openai_api_key=get_openai_api_key())
+    embeddings = embeddings or get_embedding_backend(api_key=api_key)
 
     if index_file.exists():
         print(f"✅ Existing vectorstore found at '{index_path}/'. Loading...")
-        return FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        verify_index_metadata(index_path, embeddings, vectorstore.index.d)
+        return vectorstore
 
     print("🚧 No index found. Building new vectorstore...")
 
     # --- Load PDF ---
-    pdf_loader = PyPDFLoader(pdf_path)
-    pdf_docs = pdf_loader.load()
+    pdf_docs = stamp_partition(load_document(pdf_path), "employee_handbook", Path(pdf_path).name)
     for doc in pdf_docs:
         doc.metadata["source"] = "employee_handbook"
 
     # --- Load DOCX ---
-    docx_loader = UnstructuredWordDocumentLoader(docx_path)
-    docx_docs = docx_loader.load()
+    docx_docs = stamp_partition(load_document(docx_path), "orientation_guide", Path(docx_path).name)
     for doc in docx_docs:
         doc.metadata["source"] = "orientation_guide"
 
@@ -52,19 +51,14 @@ def build_vectorstore(
     all_docs = pdf_docs + docx_docs
     print(f"📄 Loaded {len(all_docs)} total documents")
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=150,
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
-    docs = splitter.split_documents(all_docs)
+    docs = chunk_documents(all_docs)
     print(f"✂️ Split into {len(docs)} chunks")
 
     # --- Embed and Save ---
     print("💾 Saving FAISS index...")
     Path(index_path).mkdir(parents=True, exist_ok=True)
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    vectorstore.save_local(index_path)
+    vectorstore = FAISS.from_documents(docs, embeddings, ids=[doc.metadata["chunk_id"] for doc in docs])
+    save_vectorstore(vectorstore, index_path, embeddings)
 
     print(f"✅ Vectorstore built and saved to '{index_path}/'")
     return vectorstore
@@ -74,74 +68,106 @@ if __name__ == "__main__":
     build_vectorstore(index_path="faiss_index_hr_combined")
 
 
-def rebuild_vectorstore_from_docs(docs_path="docs", faiss_path="faiss_index"):
+def rebuild_vectorstore_from_docs(docs_path="docs", faiss_path="faiss_index", embeddings=None):
     docs_path = Path(docs_path)
     all_docs = []
 
     for doc_file in docs_path.glob("*"):
-        if doc_file.suffix == ".pdf":
-            loader = PyPDFLoader(str(doc_file))
-        elif doc_file.suffix == ".docx":
-            loader = UnstructuredWordDocumentLoader(str(doc_file))
-        else:
+        if doc_file.suffix not in (".pdf", ".docx"):
             continue
-        all_docs.extend(loader.load())
+        loaded = load_document(str(doc_file))
+        modified = datetime.fromtimestamp(doc_file.stat().st_mtime, tz=timezone.utc)
+        all_docs.extend(stamp_partition(loaded, infer_partition(doc_file.name), doc_file.name, modified))
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_documents(all_docs)
-    embeddings = OpenAIEmbeddings(openai_api_key=get_openai_api_key())
+    chunks, superseded = deduplicate(newest_first(chunk_documents(all_docs)))
+    if superseded:
+        print(f"🧹 Dropped {len(superseded)} near-duplicate chunks (older revisions)")
+    embeddings = embeddings or get_embedding_backend()
 
-    vectorstore = FAISS.from_documents(chunks, embeddings)
-    vectorstore.save_local(faiss_path)
+    vectorstore = FAISS.from_documents(chunks, embeddings, ids=[chunk.metadata["chunk_id"] for chunk in chunks])
+    save_vectorstore(vectorstore, faiss_path, embeddings)
     return len(all_docs), len(chunks)
 
 
-def rebuild_vectorstore_from_s3():
+# --- Ingestion Manifest ---
+def load_manifest(index_root="faiss_index") -> dict:
+    """
+    processed_hashes: MD5 of every ingested file.
+    superseded: chunk_id → the newer chunk that replaced it, with both documents.
+    Older deployments kept only a list of hashes in processed_hashes.json.
+    """
+    manifest_path = Path(index_root) / MANIFEST_FILE
+    legacy_path = Path(index_root) / "processed_hashes.json"
+    if manifest_path.exists():
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    manifest = {"processed_hashes": [], "superseded": {}}
+    if legacy_path.exists():
+        with open(legacy_path, "r") as f:
+            manifest["processed_hashes"] = json.load(f)
+    return manifest
+
+
+def save_manifest(manifest: dict, index_root="faiss_index"):
+    os.makedirs(index_root, exist_ok=True)
+    with open(Path(index_root) / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def rebuild_vectorstore_from_s3(embeddings=None, evaluate=None):
+    """
+    Ingest new S3 uploads into the served default index, keeping only the newest
+    version of each near-duplicate chunk. Older chunks a revision replaces are removed
+    from the index and recorded in the manifest. The golden-set evaluation runs unless
+    `evaluate` (default: EVALUATE_ON_UPLOAD) is off; the merged index and manifest are
+    then uploaded back to S3_INDEX_BUCKET, where the app loads them from, unless the
+    evaluation found a regression (RetrievalRegression is raised instead).
+    """
     print("🔄 Starting vectorstore rebuild from S3...")
 
-    s3 = boto3.client("s3")
-    bucket = "innovim-hr-docs-1"
-    faiss_path = "faiss_index/index"
-    processed_manifest_path = Path("faiss_index/processed_hashes.json")
-
-    # Load previously processed hashes
-    if processed_manifest_path.exists():
-        with open(processed_manifest_path, "r") as f:
-            processed_hashes = set(json.load(f))
-    else:
-        processed_hashes = set()
-
-    response = s3.list_objects_v2(Bucket=bucket)
-    if "Contents" not in response:
+    store = get_store()
+    bucket = get_secret("S3_DOCS_BUCKET", "innovim-hr-docs-1")
+    index_bucket = get_secret("S3_INDEX_BUCKET")
+    faiss_path, _ = resolve_index_location(DEFAULT_INDEX)
+
+    # Seed from the index the app serves (pulled from S3, else the local copy) and its manifest
+    embeddings = embeddings or get_embedding_backend()
+    try:
+        vectorstore = load_faiss_vectorstore(DEFAULT_INDEX, None, embeddings=embeddings)
+    except FileNotFoundError:
+        vectorstore = None
+    manifest = load_manifest(faiss_path)
+    processed_hashes = set(manifest["processed_hashes"])
+
+    objects = store.list_objects(bucket)
+    if not objects:
         print("❌ No documents found in S3.")
         return 0, 0
 
     docs = []
     new_hashes = []
 
-    for obj in response["Contents"]:
+    for obj in objects:
         key = obj["Key"]
         if not key.endswith((".pdf", ".docx")):
             continue
 
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            s3.download_file(bucket, key, tmp_file.name)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(key).suffix) as tmp_file:
+            store.download_file(bucket, key, tmp_file.name)
             print(f"⬇️ Downloaded: {key}")
 
             with open(tmp_file.name, "rb") as f:
                 file_bytes = f.read()
                 file_hash = hashlib.md5(file_bytes).hexdigest()
 
-            if file_hash in processed_hashes:
+            if file_hash in processed_hashes or file_hash in new_hashes:
                 print(f"⏭ Skipping duplicate content for: {key}")
                 continue
 
-            if key.endswith(".pdf"):
-                loader = PyPDFLoader(tmp_file.name)
-            else:
-                loader = UnstructuredWordDocumentLoader(tmp_file.name)
-
-            loaded_docs = loader.load()
+            loaded_docs = load_document(tmp_file.name)
+            stamp_partition(loaded_docs, infer_partition(key), key, obj["LastModified"])
+            for doc in loaded_docs:
+                doc.metadata["source"] = key
             print(f"📄 Loaded {len(loaded_docs)} pages from {key}")
             docs.extend(loaded_docs)
             new_hashes.append(file_hash)
@@ -150,19 +176,63 @@ def rebuild_vectorstore_from_s3():
         print("✅ No new files to process.")
         return 0, 0
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=750, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
+    chunks = chunk_documents(docs)
     print(f"🔬 Created {len(chunks)} chunks total.")
 
-    embeddings = OpenAIEmbeddings(openai_api_key=get_openai_api_key())
-    vectorstore = FAISS.from_documents(chunks, embeddings)
-    os.makedirs("faiss_index", exist_ok=True)
-    vectorstore.save_local(faiss_path)
+    existing = {}
+    if vectorstore is not None:
+        for doc_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore.search(doc_id)
+            doc.metadata.setdefault("chunk_id", doc_id)
+            existing[doc.metadata["chunk_id"]] = (doc_id, doc)
+
+    # New uploads first, then what is already indexed: the first chunk of a cluster wins
+    candidates = newest_first(chunks) + newest_first([doc for _, doc in existing.values()])
+    kept, superseded = deduplicate(candidates)
+    by_id = {chunk.metadata["chunk_id"]: chunk for chunk in chunks}
+
+    # Identical text re-uploaded: keep the stored vector, credit the newest document
+    unchanged = {old_id for old_id, new_id in superseded.items() if old_id == new_id}
+    for chunk_id in unchanged:
+        existing[chunk_id][1].metadata.update(by_id[chunk_id].metadata)
+        del superseded[chunk_id]
+
+    kept_ids = {chunk.metadata["chunk_id"] for chunk in kept}
+    new_chunks = [chunk for chunk in chunks if chunk.metadata["chunk_id"] in kept_ids - unchanged]
+    stale = [existing[chunk_id][0] for chunk_id in superseded if chunk_id in existing]
+    print(
+        f"🧹 {len(superseded)} near-duplicate chunks superseded, {len(unchanged)} unchanged; "
+        f"embedding {len(new_chunks)} of {len(chunks)} new chunks"
+    )
+
+    by_id.update({chunk_id: doc for chunk_id, (_, doc) in existing.items()})
+    for old_id, new_id in superseded.items():
+        manifest["superseded"][old_id] = {
+            "superseded_by": new_id,
+            "document": by_id[old_id].metadata.get("document"),
+            "by_document": by_id[new_id].metadata.get("document"),
+        }
+
+    if vectorstore is None:
+        vectorstore = FAISS.from_documents(new_chunks, embeddings, ids=[chunk.metadata["chunk_id"] for chunk in new_chunks])
+    else:
+        if stale:
+            vectorstore.delete(stale)
+        if new_chunks:
+            vectorstore.add_documents(new_chunks, ids=[chunk.metadata["chunk_id"] for chunk in new_chunks])
+    os.makedirs(faiss_path, exist_ok=True)
+    if evaluate is None:
+        evaluate = evaluate_on_upload_enabled()
+    evaluation = save_vectorstore(vectorstore, faiss_path, embeddings, evaluate=evaluate)
 
     # Save updated manifest
-    processed_hashes.update(new_hashes)
-    with open(processed_manifest_path, "w") as f:
-        json.dump(list(processed_hashes), f)
+    manifest["processed_hashes"] = sorted(processed_hashes.union(new_hashes))
+    save_manifest(manifest, faiss_path)
+    print(f"✅ Vectorstore saved to {faiss_path}/")
+    raise_on_regression(evaluation)  # the served index (and its manifest) stay as they were
 
-    print(f"✅ Vectorstore saved to {faiss_path}")
-    return len(new_hashes), len(chunks)
+    if index_bucket:
+        upload_index_to_s3(faiss_path, index_bucket, DEFAULT_INDEX)
+    else:
+        print("⚠️ S3_INDEX_BUCKET is not set; the rebuilt index stays local only")
+    return len(new_hashes), len(new_chunks)